@@ -0,0 +1,93 @@
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import sys
+
+MODULES = ['main4', 'engine', 'sweep', 'figures', 'plot']
+
+# run in a fresh interpreter: import time, peak memory and whether matplotlib was loaded
+IMPORT_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import %s
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'maxRssKB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'matplotlib': 'matplotlib' in sys.modules}))
+'''
+
+
+def measureImport(module, repeats=5):
+    """
+    imports a module in fresh interpreters
+    :return: the best import time in seconds, the peak RSS of the interpreter in KB and whether matplotlib was loaded
+    """
+    runs = [json.loads(subprocess.run([sys.executable, '-c', IMPORT_PROBE % module], capture_output=True, text=True,
+                                      check=True).stdout) for _ in range(repeats)]
+    return min(run['seconds'] for run in runs), max(run['maxRssKB'] for run in runs), runs[0]['matplotlib']
+
+
+def workerMemory(_):
+    import sweep  # what a sweep worker imports
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'matplotlib' in sys.modules
+
+
+def measureWorkers(processes=4, method='spawn'):
+    """
+    starts a pool of workers like runSweep does (spawn: a fresh interpreter per worker, as on macOS and Windows)
+    :return: the peak RSS of each worker in KB and whether any of them loaded matplotlib
+    """
+    with multiprocessing.get_context(method).Pool(processes) as pool:
+        results = pool.map(workerMemory, range(processes), chunksize=1)
+    return [rss for rss, _ in results], any(loaded for _, loaded in results)
+
+
+# run in a fresh interpreter: a small sweep on one backend, its time and the peak memory of the parent and of the workers
+BACKEND_PROBE = '''
+import json, resource, time
+import sweep
+configs = sweep.figure3Grid()[:%d]
+start = time.perf_counter()
+sweep.runSweep(configs, %d, %d, %d, engineName='batched', backend=%r)
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'parentKB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'workerKB': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss}))
+'''
+
+
+def measureBackend(backend, points=4, experiments=4, generations=200, workers=4):
+    """
+    runs the same small sweep with the batched engine on worker processes or threads, in a fresh interpreter
+    :return: the replicas per second, the peak RSS of the parent and the largest peak RSS of a worker process in KB
+        (0 for threads)
+    """
+    run = json.loads(subprocess.run([sys.executable, '-c', BACKEND_PROBE % (points, experiments, generations, workers, backend)],
+                                    capture_output=True, text=True, check=True).stdout.splitlines()[-1])
+    return points * experiments / run['seconds'], run['parentKB'], run['workerKB'] if backend == 'processes' else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the startup cost of the simulation modules and of the workers')
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--processes', type=int, default=4, help='workers of the pool')
+    parser.add_argument('--backends', action='store_true',
+                        help='also compare the process and thread backends of the sweeps (batched engine)')
+    arguments = parser.parse_args()
+
+    print('%-8s %10s %10s  %s' % ('module', 'import', 'peak RSS', 'matplotlib'))
+    for module in MODULES:
+        seconds, rss, matplotlib = measureImport(module, arguments.repeats)
+        print('%-8s %9.0fms %8.1fMB  %s' % (module, seconds * 1000, rss / 1024, 'yes' if matplotlib else 'no'))
+    seconds, rss, matplotlib = measureImport('plot; plot.pyplot()', arguments.repeats)
+    print('%-8s %9.0fms %8.1fMB  %s' % ('pyplot', seconds * 1000, rss / 1024, 'yes' if matplotlib else 'no'))
+    rss, matplotlib = measureWorkers(arguments.processes)
+    print('workers: %s MB peak RSS, matplotlib %s' % (', '.join('%.1f' % (value / 1024) for value in rss),
+                                                      'loaded' if matplotlib else 'not loaded'))
+    if arguments.backends:
+        print('%-9s %12s %12s %12s' % ('backend', 'replicas/s', 'parent RSS', 'worker RSS'))
+        for backend in ('processes', 'threads'):
+            rate, parent, worker = measureBackend(backend, workers=arguments.processes)
+            total = parent + arguments.processes * worker  # upper bound: every worker at the peak of the largest one
+            print('%-9s %12.2f %10.1fMB %10.1fMB  (about %.0fMB in all)' % (backend, rate, parent / 1024, worker / 1024,
+                                                                            total / 1024))
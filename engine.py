@@ -0,0 +1,480 @@
+import concurrent.futures
+import time
+import numpy as np
+import main4
+from main4 import RISK_CURVES, RiskRoundType
+
+PURPOSES = ('init', 'pairing', 'risk', 'loss', 'selection', 'mutation')  # the random streams of an experience
+
+
+def getClasses(config):
+    """
+    returns the wealth classes of the population: config.wealthClasses if given, else the richs (class 0) then the poors
+    :param config: the SimulationConfig
+    :return: the size, the wealth and the loss fraction alpha of each class, as np-arrays
+    """
+    classes = config.wealthClasses or ((config.numberOfRichs, config.wealthR, config.alphaR),
+                                       (config.numberOfPoors, config.wealthP, config.alphaP))
+    sizes, wealth, alphas = zip(*classes)
+    return np.array(sizes), np.array(wealth, dtype=np.float64), np.array(alphas, dtype=np.float64)
+
+
+def initWealth(config, classOf, wealth, rng):
+    """
+    generates the initial wealth of each individual, around the wealth of its class if config.wealthSpread > 0
+    :param classOf: the class of each individual
+    :param wealth: the wealth of each class
+    :return: the wealth of each individual as np-array
+    """
+    players = wealth[classOf]
+    if config.wealthSpread == 0 or config.wealthDistribution == 'constant':
+        return players.copy()
+    if config.wealthDistribution == 'normal':
+        return players * np.maximum(rng.normal(1, config.wealthSpread, len(players)), 0.01)
+    if config.wealthDistribution == 'lognormal':
+        deviation = np.sqrt(np.log(1 + config.wealthSpread ** 2))
+        return players * rng.lognormal(-deviation ** 2 / 2, deviation, len(players))
+    raise ValueError("unknown wealth distribution %r" % config.wealthDistribution)
+
+
+def initStrategies(wealthOf, rho, rng):
+    """
+    generates the initial strategies: tau uniform in [0, 1), a and b uniform in [0, wealth of the individual)
+    :param wealthOf: the wealth of each individual
+    :return: the strategies; size (individuals, rho, 3)
+    """
+    strategies = rng.random((len(wealthOf), rho, 3))
+    strategies[:, :, 1:] *= wealthOf[:, None, None]
+    return strategies
+
+
+def commonStreams(seed, replica, generation):
+    """
+    returns one np.random.Generator per purpose, keyed by (seed, replica, generation, purpose) only and not by the
+    parameters, so that every configuration of a sweep draws the same pairings, risk rounds, loss draws, selection
+    draws and mutations (common random numbers)
+    :return: dictionary purpose -> np.random.Generator
+    """
+    return {purpose: np.random.default_rng([seed, replica, generation, index]) for index, purpose in enumerate(PURPOSES)}
+
+
+def getRiskRounds(config, games, rng):
+    """
+    returns the rounds at which a loss can happen in each game, see main4.getRiskRounds
+    :return: boolean mask; size (games, rho)
+    """
+    return main4.getRiskRounds(config.riskRoundType, games, config.rho, rng, config.riskRoundCount,
+                               config.riskRoundProbability)
+
+
+def getRiskSchedules(config):
+    """
+    returns every mask getRiskRounds can draw and its probability: one mask for the fixed timings, the rho one-round
+    masks of RandomRound (equally likely) and GeometricHorizon (the last round taking the rest of the geometric law),
+    the 2^rho masks of BernoulliRounds
+    :return: the masks; size (schedules, rho), and their probabilities; size (schedules)
+    """
+    rho, probability = config.rho, config.riskRoundProbability
+    if config.riskRoundType == RiskRoundType.RandomRound:
+        return np.eye(rho, dtype=bool), np.full(rho, 1 / rho)
+    if config.riskRoundType == RiskRoundType.GeometricHorizon:
+        weights = probability * (1 - probability) ** np.arange(rho)
+        weights[-1] = (1 - probability) ** (rho - 1)
+        return np.eye(rho, dtype=bool), weights
+    if config.riskRoundType == RiskRoundType.BernoulliRounds:
+        masks = (np.arange(2 ** rho)[:, None] >> np.arange(rho)) & 1 == 1
+        risky = masks.sum(axis=1)
+        return masks, probability ** risky * (1 - probability) ** (rho - risky)
+    return getRiskRounds(config, 1, None), np.ones(1)
+
+
+def playBucket(strategyA, strategyB, thresholdA, thresholdB, wealthA, wealthB, alphaA, alphaB, riskRounds, riskCurve,
+               lambdaA, totalWealth, rng, stats=None):
+    """
+    plays a batch of games whose players A all belong to one class and players B to one class, round by round for the
+    whole batch; same rules as main4.play
+    :param strategyA: strategies of the players A; size (games, rho, 3)
+    :param thresholdA: commonWealth thresholds (tau times the total wealth) of the players A; size (games, rho)
+    :param wealthA: initial wealth of the players A, one for the whole batch or one per game
+    :param alphaA: loss fraction of the players A
+    :param riskRounds: the rounds at which a loss can happen in each game; size (games, rho)
+    :param riskCurve: the loss probability function (getPCR1, getPCR2 or getPCR3)
+    :param totalWealth: wealthA + wealthB, normalizer of the loss probability
+    :return: payoffs of A and B; size (games); contributions of A and B; size (games, rho)
+    """
+    games, rho = riskRounds.shape
+    remainingA = np.broadcast_to(np.asarray(wealthA, dtype=np.float64), (games,)).copy()
+    remainingB = np.broadcast_to(np.asarray(wealthB, dtype=np.float64), (games,)).copy()
+    payoffA, payoffB = remainingA.copy(), remainingB.copy()
+    contributionA, contributionB = np.zeros((games, rho)), np.zeros((games, rho))
+    commonWealth = np.zeros(games)
+    for r in range(rho):
+        giftA = np.where(commonWealth <= thresholdA[:, r], strategyA[:, r, 1], strategyA[:, r, 2])
+        giftB = np.where(commonWealth <= thresholdB[:, r], strategyB[:, r, 1], strategyB[:, r, 2])
+        contributionA[:, r] = np.where(giftA <= remainingA, giftA, 0)
+        contributionB[:, r] = np.where(giftB <= remainingB, giftB, 0)
+        remainingA -= contributionA[:, r]
+        remainingB -= contributionB[:, r]
+        commonWealth += contributionA[:, r] + contributionB[:, r]
+
+        probability = np.where(riskRounds[:, r], riskCurve(commonWealth, lambdaA, totalWealth), 0)
+        lossEvent = rng.random(games) <= probability
+        lossEvent &= riskRounds[:, r]
+        remainingA = np.where(lossEvent, remainingA * (1 - alphaA), remainingA)
+        remainingB = np.where(lossEvent, remainingB * (1 - alphaB), remainingB)
+        payoffA = (1 - alphaA * probability) * (payoffA - giftA)
+        payoffB = (1 - alphaB * probability) * (payoffB - giftB)
+        if stats:
+            stats.count('lossEvents', int(np.count_nonzero(lossEvent)))
+    return payoffA, payoffB, contributionA, contributionB
+
+
+def playGroups(strategies, thresholds, wealth, alphas, riskRounds, riskCurve, lambdaA, rng, stats=None):
+    """
+    plays a batch of games between groups of M players, round by round for the whole batch; same rules as main4.play
+    with M players instead of two: every player compares the common wealth of its group with its own threshold, and a
+    loss event hits the whole group
+    :param strategies: strategies of the players; size (games, M, rho, 3)
+    :param thresholds: commonWealth thresholds (tau times the total wealth of the group); size (games, M, rho)
+    :param wealth: initial wealth of the players; size (games, M)
+    :param alphas: loss fraction of the players; size (games, M)
+    :param riskRounds: the rounds at which a loss can happen in each game; size (games, rho)
+    :return: payoffs of the players; size (games, M); contributions of the players; size (games, M, rho)
+    """
+    games, rho = riskRounds.shape
+    totalWealth = wealth.sum(axis=1)
+    remaining = wealth.copy()
+    payoff = wealth.copy()
+    contribution = np.zeros(strategies.shape[:3])
+    commonWealth = np.zeros(games)
+    for r in range(rho):
+        gift = np.where(commonWealth[:, None] <= thresholds[:, :, r], strategies[:, :, r, 1], strategies[:, :, r, 2])
+        contribution[:, :, r] = np.where(gift <= remaining, gift, 0)
+        remaining -= contribution[:, :, r]
+        commonWealth += contribution[:, :, r].sum(axis=1)
+
+        probability = np.where(riskRounds[:, r], riskCurve(commonWealth, lambdaA, totalWealth), 0)
+        lossEvent = (rng.random(games) <= probability) & riskRounds[:, r]
+        remaining = np.where(lossEvent[:, None], remaining * (1 - alphas), remaining)
+        payoff = (1 - alphas * probability[:, None]) * (payoff - gift)
+        if stats:
+            stats.count('lossEvents', int(np.count_nonzero(lossEvent)))
+    return payoff, contribution
+
+
+def drawGroups(individuals, games, size, rng):
+    """
+    draws games groups of size distinct individuals in games x size^2 work, whatever the population: the k-th member is
+    drawn among the individuals - k others, then moved past the members already drawn, in increasing order (the pair
+    trick of simulateGeneration, generalised)
+    :return: size (games, size)
+    """
+    groups = np.empty((games, size), dtype=np.int64)
+    for k in range(size):
+        member = rng.integers(0, individuals - k, games)
+        for drawn in np.sort(groups[:, :k], axis=1).T:
+            member += member >= drawn
+        groups[:, k] = member
+    return groups
+
+
+def simulateGroups(config, strategies, classOf, wealthOf, alphas, rngs, stats=None, played=None):
+    """
+    plays config.games games between random groups of config.groupSize distinct individuals, all in one batch
+    :param wealthOf: the wealth of each individual
+    :param alphas: the loss fraction of each class
+    :return: the fitness of each individual and the average contribution of each class at each round; size (classes, rho)
+    """
+    start = time.perf_counter()
+    individuals, classes, rho, games = len(classOf), len(alphas), config.rho, config.games
+    groups = drawGroups(individuals, games, config.groupSize, rngs['pairing'])
+    wealth = wealthOf[groups]
+    thresholds = strategies[groups, :, 0] * wealth.sum(axis=1)[:, None, None]
+    riskRounds = getRiskRounds(config, games, rngs['risk'])
+    if stats:
+        start = stats.lap('pairing', start)
+
+    payoff, contribution = playGroups(strategies[groups], thresholds, wealth, alphas[classOf[groups]], riskRounds,
+                                      RISK_CURVES[config.riskCurve], config.lambdaA, rngs['loss'], stats)
+    if stats:
+        start = stats.lap('play', start)
+
+    players = groups.ravel()
+    payoffs = np.bincount(players, payoff.ravel(), individuals)
+    frequency = np.bincount(players, minlength=individuals)
+    fitness = np.exp(payoffs / np.maximum(frequency, 1))
+    if played is not None:
+        played[:] = frequency
+    playerClasses = classOf[players]
+    contributions = contribution.reshape(-1, rho)
+    taken = np.bincount(playerClasses, minlength=classes)
+    contribution = np.stack([np.bincount(playerClasses, contributions[:, r], classes) for r in range(rho)], axis=1)
+    if stats:
+        stats.lap('fitness', start)
+        stats.count('games', games)
+    return fitness, contribution / np.maximum(taken, 1)[:, None]
+
+
+def playAllPairs(strategies, wealthOf, alphaOf, riskWeights, riskCurve, lambdaA):
+    """
+    plays every ordered pair of individuals at once for one risk schedule, with expected values instead of random loss
+    events: at each risky round the remaining wealth loses alpha times the loss probability, so the games are
+    deterministic
+    :param strategies: the strategies of the population; size (individuals, rho, 3)
+    :param wealthOf: the wealth of each individual
+    :param alphaOf: the loss fraction of each individual
+    :param riskWeights: 1 for the rounds at which a loss can happen, 0 for the others (a mask of getRiskSchedules)
+    :return: payoff of the first player of each pair; size (individuals, individuals); its contributions; size
+        (individuals, individuals, rho)
+    """
+    individuals, rho = strategies.shape[:2]
+    totalWealth = wealthOf[:, None] + wealthOf[None, :]
+    thresholds = strategies[:, None, :, 0] * totalWealth[:, :, None]
+    remainingA = np.broadcast_to(wealthOf[:, None], totalWealth.shape).copy()
+    payoff = remainingA.copy()
+    contribution = np.zeros((individuals, individuals, rho))
+    for r in range(rho):
+        # gift[i, j] is the gift of i playing against j; the gift of j in the same game is gift[j, i]
+        commonWealth = contribution.sum(axis=2) + contribution.sum(axis=2).T
+        gift = np.where(commonWealth <= thresholds[:, :, r], strategies[:, None, r, 1], strategies[:, None, r, 2])
+        contribution[:, :, r] = np.where(gift <= remainingA, gift, 0)
+        remainingA -= contribution[:, :, r]
+        probability = riskWeights[r] * riskCurve(commonWealth + contribution[:, :, r] + contribution[:, :, r].T,
+                                                 lambdaA, totalWealth)
+        remainingA = remainingA * (1 - alphaOf[:, None] * probability)
+        payoff = (1 - alphaOf[:, None] * probability) * (payoff - gift)
+    return payoff, contribution
+
+
+def simulateRoundRobin(config, strategies, classOf, wealthOf, alphas, stats=None, played=None):
+    """
+    plays every pair of distinct individuals once with expected payoffs instead of config.games random pairs, so the
+    fitness carries no sampling noise; cheaper than the random pairs for small populations (40 individuals: 780 pairs).
+    The random risk schedules are averaged over all their outcomes (getRiskSchedules, 2^rho games per pair for
+    BernoulliRounds), but the loss events are still replaced by their expected effect on the remaining wealth
+    (playAllPairs), an approximation of the random games when a loss makes the next gifts unaffordable
+    :param wealthOf: the wealth of each individual
+    :param alphas: the loss fraction of each class
+    :return: the fitness of each individual and the average contribution of each class at each round; size (classes, rho)
+    """
+    start = time.perf_counter()
+    individuals, classes = len(classOf), len(alphas)
+    payoff, contribution = 0, 0
+    for mask, weight in zip(*getRiskSchedules(config)):
+        schedulePayoff, scheduleContribution = playAllPairs(strategies, wealthOf, alphas[classOf], mask.astype(np.float64),
+                                                            RISK_CURVES[config.riskCurve], config.lambdaA)
+        payoff, contribution = payoff + weight * schedulePayoff, contribution + weight * scheduleContribution
+    if stats:
+        start = stats.lap('play', start)
+
+    if played is not None:
+        played[:] = individuals - 1
+    others = ~np.eye(individuals, dtype=bool)
+    fitness = np.exp((payoff * others).sum(axis=1) / (individuals - 1))
+    contributions = (contribution * others[:, :, None]).sum(axis=1) / (individuals - 1)
+    contribution = np.stack([np.bincount(classOf, contributions[:, r], classes) for r in range(config.rho)], axis=1)
+    if stats:
+        stats.lap('fitness', start)
+        stats.count('games', individuals * (individuals - 1) // 2)
+    return fitness, contribution / np.bincount(classOf, minlength=classes)[:, None]
+
+
+def simulateGeneration(config, strategies, classOf, wealth, alphas, wealthOf, rngs, stats=None, played=None):
+    """
+    plays config.games games between random pairs of distinct individuals, grouped by the classes of the two players
+    so that each class pair is played as one batch
+    :param strategies: the strategies of the population; size (individuals, rho, 3)
+    :param classOf: the class of each individual
+    :param wealth: the wealth of each class
+    :param alphas: the loss fraction of each class
+    :param wealthOf: the wealth of each individual, None if it is the wealth of its class
+    :param rngs: the np.random.Generator of each purpose (PURPOSES)
+    :param played: if given, filled with the amount of games played by each individual
+    :return: the fitness of each individual and the average contribution of each class at each round; size (classes, rho)
+    """
+    if config.pairing == 'roundRobin':
+        if config.groupSize != 2:
+            raise ValueError("the round robin only plays pairs")
+        return simulateRoundRobin(config, strategies, classOf, wealth[classOf] if wealthOf is None else wealthOf, alphas,
+                                  stats, played)
+    if config.groupSize > 2:
+        return simulateGroups(config, strategies, classOf, wealth[classOf] if wealthOf is None else wealthOf, alphas,
+                              rngs, stats, played)
+    start = time.perf_counter()
+    individuals, games = len(classOf), config.games
+    playerA = rngs['pairing'].integers(0, individuals, games)
+    playerB = rngs['pairing'].integers(0, individuals - 1, games)
+    playerB += playerB >= playerA
+    return playPairs(config, strategies, classOf, wealth, alphas, wealthOf, playerA, playerB, rngs, stats, played, start)
+
+
+def playPairs(config, strategies, classOf, wealth, alphas, wealthOf, playerA, playerB, rngs, stats=None, played=None,
+              start=None):
+    """
+    plays one game for each pair (playerA[i], playerB[i]), grouped by the classes of the two players so that each class
+    pair is played as one batch; see simulateGeneration for the other parameters
+    :param start: when the pairing started, for the profiling
+    :return: the fitness of each individual and the average contribution of each class at each round; size (classes, rho)
+    """
+    start = time.perf_counter() if start is None else start
+    individuals, classes, rho, games = len(classOf), len(wealth), config.rho, len(playerA)
+    pairClass = classOf[playerA] * classes + classOf[playerB]
+    order = np.argsort(pairClass, kind='stable')
+    playerA, playerB, pairClass = playerA[order], playerB[order], pairClass[order]
+    bounds = np.searchsorted(pairClass, np.arange(classes * classes + 1))
+    if wealthOf is None:
+        # thresholds of each individual against each class of partner: tau * (own wealth + wealth of the partner)
+        thresholds = strategies[:, :, 0, None] * (wealth[classOf][:, None, None] + wealth[None, None, :])
+    riskRounds = getRiskRounds(config, games, rngs['risk'])
+    riskCurve = RISK_CURVES[config.riskCurve]
+    if stats:
+        start = stats.lap('pairing', start)
+
+    payoffA, payoffB = np.zeros(games), np.zeros(games)
+    contributionA, contributionB = np.zeros((games, rho)), np.zeros((games, rho))
+    for bucket in range(classes * classes):
+        first, last = bounds[bucket], bounds[bucket + 1]
+        if first == last:
+            continue
+        classA, classB = divmod(bucket, classes)
+        a, b = playerA[first:last], playerB[first:last]
+        if wealthOf is None:
+            wealthA, wealthB = wealth[classA], wealth[classB]
+            thresholdA, thresholdB = thresholds[a, :, classB], thresholds[b, :, classA]
+        else:
+            wealthA, wealthB = wealthOf[a], wealthOf[b]
+            thresholdA = strategies[a, :, 0] * (wealthA + wealthB)[:, None]
+            thresholdB = strategies[b, :, 0] * (wealthA + wealthB)[:, None]
+        payoffA[first:last], payoffB[first:last], contributionA[first:last], contributionB[first:last] = playBucket(
+            strategies[a], strategies[b], thresholdA, thresholdB, wealthA, wealthB, alphas[classA], alphas[classB],
+            riskRounds[first:last], riskCurve, config.lambdaA, wealthA + wealthB, rngs['loss'], stats)
+    if stats:
+        start = stats.lap('play', start)
+
+    payoffs = np.bincount(playerA, payoffA, individuals) + np.bincount(playerB, payoffB, individuals)
+    frequency = np.bincount(playerA, minlength=individuals) + np.bincount(playerB, minlength=individuals)
+    fitness = np.exp(payoffs / np.maximum(frequency, 1))
+    if played is not None:
+        played[:] = frequency
+    players = np.concatenate([classOf[playerA], classOf[playerB]])
+    contributions = np.concatenate([contributionA, contributionB])
+    taken = np.bincount(players, minlength=classes)
+    contribution = np.stack([np.bincount(players, contributions[:, r], classes) for r in range(rho)], axis=1)
+    if stats:
+        stats.lap('fitness', start)
+        stats.count('games', games)
+    return fitness, contribution / np.maximum(taken, 1)[:, None]
+
+
+def select(strategies, fitness, sizes, rng):
+    """
+    every individual copies the strategy of an individual of its class, chosen proportionally to the fitness; the
+    individuals are sorted by class, so one draw in the cumulated fitness serves every class at once
+    """
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    classOf = np.repeat(np.arange(len(sizes)), sizes)
+    cumulated = np.cumsum(fitness)
+    before = np.concatenate([[0], cumulated])[starts]
+    draws = before[classOf] + rng.random(len(fitness)) * (cumulated[ends - 1] - before)[classOf]
+    newIndex = np.searchsorted(cumulated, draws, side='right')
+    return strategies[np.clip(newIndex, starts[classOf], ends[classOf] - 1)]
+
+
+def mutate(strategies, wealthOf, mu, sigma, rng):
+    """
+    with probability mu, noise is added to tau and a (or b) is drawn again, independently for each round
+    :param wealthOf: the wealth of each individual, upper bound of a and b
+    :return: the amount of mutations
+    """
+    mutations = rng.random(strategies.shape) <= mu
+    count = int(np.count_nonzero(mutations))
+    tau = mutations[:, :, 0]
+    strategies[:, :, 0][tau] += rng.normal(0, sigma, np.count_nonzero(tau))
+    gifts = mutations[:, :, 1:]
+    redrawn = rng.random(strategies[:, :, 1:].shape) * wealthOf[:, None, None]
+    strategies[:, :, 1:][gifts] = redrawn[gifts]
+    return count
+
+
+def evolve(config, generations, rng, stats=None, progress=None, common=None, strategies=None, burnIn=0, trajectory=None,
+           payoffs=None, recorder=None, histogram=None):
+    """
+    evolves a population during burnIn then generations generations, like main4.experience but with batched games
+    :param config: the SimulationConfig
+    :param rng: the np.random.Generator of the experience
+    :param stats: if given, profiling.Stats accumulating the time of each stage and the counters
+    :param progress: if given, called with the amount of generations done and the games per generation
+    :param common: if given, (seed, replica) of the common random numbers used instead of rng, see commonStreams
+    :param strategies: if given, the initial population (e.g. evolved with neighbouring parameters) instead of a random one
+    :param burnIn: generations run before the contributions are averaged
+    :param trajectory: if given, filled with the contribution of each class at each averaged generation; size
+        (generations, classes, rho)
+    :param payoffs: if given, filled with the mean payoff of each class at each averaged generation; size
+        (generations, classes)
+    :param recorder: if given, recorder.StrategyRecorder receiving the population played at each averaged generation
+    :param histogram: if given, sketches.StrategyHistogram where the population played at each averaged generation is
+        added
+    :return: the contribution of each class at each round averaged over the last generations; size (classes, rho), and
+        the final strategies
+    """
+    sizes, wealth, alphas = getClasses(config)
+    classOf = np.repeat(np.arange(len(sizes)), sizes)
+    rngs = dict.fromkeys(PURPOSES, rng) if common is None else commonStreams(*common, 0)
+    wealthOf = initWealth(config, classOf, wealth, rngs['init'])
+    if strategies is None:
+        strategies = initStrategies(wealthOf, config.rho, rngs['init'])
+    else:
+        strategies = strategies.copy()
+        strategies[:, :, 1:] = np.minimum(strategies[:, :, 1:], wealthOf[:, None, None])
+    individualWealth = None if config.wealthSpread == 0 or config.wealthDistribution == 'constant' else wealthOf
+    contributionTotal = np.zeros((len(sizes), config.rho))
+    for i in range(burnIn + generations):
+        if common is not None:
+            rngs = commonStreams(*common, i)
+        if recorder is not None and i >= burnIn:
+            recorder.record(i - burnIn, strategies)
+        if histogram is not None and i >= burnIn:
+            histogram.update(strategies, classOf, wealthOf)
+        fitness, contribution = simulateGeneration(config, strategies, classOf, wealth, alphas, individualWealth, rngs, stats)
+        if i >= burnIn:
+            contributionTotal += contribution
+            if trajectory is not None:
+                trajectory[i - burnIn] = contribution
+            if payoffs is not None:
+                payoffs[i - burnIn] = np.bincount(classOf, np.log(fitness), len(sizes)) / sizes
+
+        start = time.perf_counter()
+        strategies = select(strategies, fitness, sizes, rngs['selection'])
+        if stats:
+            start = stats.lap('selection', start)
+        mutations = mutate(strategies, wealthOf, config.mu, config.sigma, rngs['mutation'])
+        if stats:
+            stats.lap('mutation', start)
+            stats.count('mutations', mutations)
+            stats.count('generations')
+        if progress:
+            progress(i + 1, config.games)
+    return contributionTotal / generations, strategies
+
+
+def experience(config, generations, rng, stats=None, progress=None, common=None, histogram=None):
+    """
+    evolves a random population during the given generations, see evolve
+    :return: the contribution of each class at each round averaged over the generations; size (classes, rho)
+    """
+    return evolve(config, generations, rng, stats, progress, common, histogram=histogram)[0]
+
+
+def averageExperiences(config, experiments, generations, seed=0, threads=None):
+    """
+    performs the experience experiments times, like main4.averageExperiences but on a pool of threads sharing the
+    process: every replica draws from its own generator, spawned from seed, so the results do not depend on the threads
+    :param threads: the amount of threads (all the cores by default)
+    :return: the contributions of the richest and of the poorest class at each round of each experiment; size
+        (experiments, rho)
+    """
+    streams = np.random.SeedSequence(seed).spawn(experiments)
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        contributions = list(pool.map(lambda stream: experience(config, generations, np.random.default_rng(stream)), streams))
+    return np.array([contribution[0] for contribution in contributions]), np.array([contribution[-1] for contribution in contributions])
@@ -0,0 +1,211 @@
+import argparse
+import dataclasses
+import math
+import os
+import sys
+import numpy as np
+import engine
+import figures
+import main4
+import sweep
+from store import parseLegacyResults
+
+CLASSES = ('richs', 'poors')
+MIN_EXPERIMENTS = 10  # replicas below which the bootstrap intervals of Report are too unreliable
+
+
+def ksTest(first, second):
+    """
+    two-sample Kolmogorov-Smirnov test
+    :return: the statistic D (largest distance between the empirical distributions) and its asymptotic p-value
+    """
+    first, second = np.sort(np.ravel(first)), np.sort(np.ravel(second))
+    values = np.concatenate([first, second])
+    distance = np.max(np.abs(np.searchsorted(first, values, side='right') / len(first) -
+                             np.searchsorted(second, values, side='right') / len(second)))
+    size = len(first) * len(second) / (len(first) + len(second))
+    x = (math.sqrt(size) + 0.12 + 0.11 / math.sqrt(size)) * distance
+    if x < 0.3:
+        return distance, 1.0
+    pValue = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * x * x) for k in range(1, 101))
+    return distance, min(max(pValue, 0.0), 1.0)
+
+
+def standardError(first, second, axis=-1):
+    """
+    returns the standard error of the difference of the means of two samples
+    """
+    return np.sqrt(first.var(axis=axis, ddof=1) / first.shape[axis] + second.var(axis=axis, ddof=1) / second.shape[axis])
+
+
+def bootstrapDifferences(first, second, rng, resamples=2000):
+    """
+    studentized bootstrap of the difference of the means of two samples: the quantiles of the resampled t statistics
+    give the interval of the difference (see Report), which keeps its level for the small samples of the replicas,
+    where the percentiles of the resampled differences are too narrow
+    :return: the difference, its standard error and the resampled t statistics
+    """
+    first, second = np.ravel(first), np.ravel(second)
+    difference, error = first.mean() - second.mean(), standardError(first, second)
+    statistics = []
+    for _ in range(resamples // 100):
+        firstResampled = first[rng.integers(0, len(first), (100, len(first)))]
+        secondResampled = second[rng.integers(0, len(second), (100, len(second)))]
+        resampledError = standardError(firstResampled, secondResampled)
+        resampled = firstResampled.mean(axis=1) - secondResampled.mean(axis=1) - difference
+        statistics.append(np.divide(resampled, resampledError, out=np.zeros_like(resampled), where=resampledError > 0))
+    return difference, error, np.concatenate(statistics)
+
+
+class Report:
+    """
+    the results of the tests of a comparison, Bonferroni-corrected: a test fails if its p-value is below alpha divided by
+    the amount of tests, or if its bootstrap interval at the level 1 - alpha / amount of tests excludes 0 (the most
+    extreme levels falling back on the extremes of the resamples, which only widens the intervals); the bootstrap needs
+    about 10 values per sample (MIN_EXPERIMENTS replicas) to be trusted
+    """
+
+    def __init__(self, name, alpha=0.01):
+        self.name = name
+        self.alpha = alpha
+        self.tests = []  # (label, statistic, p-value, bootstrap differences)
+
+    def add(self, label, statistic, pValue, differences=None):
+        """
+        :param differences: if given, the studentized bootstrap of the difference tested, see bootstrapDifferences
+        """
+        self.tests.append((label, statistic, pValue, differences))
+
+    def interval(self, differences):
+        difference, error, statistics = differences
+        tail = self.alpha / max(len(self.tests), 1) / 2
+        low, high = np.quantile(statistics, [tail, 1 - tail])
+        return difference - high * error, difference - low * error
+
+    def failures(self):
+        """
+        :return: the labels of the failed tests
+        """
+        threshold = self.alpha / max(len(self.tests), 1)
+        return [label for label, _, pValue, differences in self.tests if pValue < threshold or
+                (differences is not None and not self.interval(differences)[0] <= 0 <= self.interval(differences)[1])]
+
+    def __str__(self):
+        failed = self.failures()
+        lines = ['%s: %d tests, %d failed' % (self.name, len(self.tests), len(failed))]
+        for label, statistic, pValue, differences in self.tests:
+            bounds = '' if differences is None else '  CI [%+.4f, %+.4f]' % self.interval(differences)
+            mark = 'FAIL ' if label in failed else '     '
+            lines.append('  %s%-28s stat %.4f  p %.4f%s' % (mark, label, statistic, pValue, bounds))
+        return '\n'.join(lines)
+
+
+def compareGames(config, games=20000, seed=0):
+    """
+    plays the same games (same players, same risk rounds) with main4.play and with engine.playBucket and compares the
+    distributions of the payoffs and of the contributions at each round; the strategies are random, so every branch of
+    the rules is reached
+    :return: a Report
+    """
+    rng = np.random.default_rng(seed)
+    main4.applyConfig(config)
+    np.random.seed(seed)
+    report = Report('games %s' % config.riskRoundType.name)
+    pairs = [(config.wealthR, config.alphaR), (config.wealthP, config.alphaP)]
+    riskCurve = main4.RISK_CURVES[config.riskCurve]
+    for classA, (wealthA, alphaA) in enumerate(pairs):
+        for classB, (wealthB, alphaB) in enumerate(pairs):
+            strategyA = engine.initStrategies(np.full(games, float(wealthA)), config.rho, rng)
+            strategyB = engine.initStrategies(np.full(games, float(wealthB)), config.rho, rng)
+            riskRounds = engine.getRiskRounds(config, games, rng)
+            reference = [main4.play(wealthA, strategyA[g], wealthB, strategyB[g], alphaA, alphaB, riskRounds[g])
+                         for g in range(games)]
+            payoffA, payoffB, contributionA, contributionB = (np.array(values) for values in zip(*reference))
+            candidate = engine.playBucket(strategyA, strategyB, strategyA[:, :, 0] * (wealthA + wealthB),
+                                          strategyB[:, :, 0] * (wealthA + wealthB), wealthA, wealthB, alphaA, alphaB,
+                                          riskRounds, riskCurve, config.lambdaA, wealthA + wealthB, rng)
+            pair = CLASSES[classA][0] + CLASSES[classB][0]
+            for label, expected, actual in [('payoff A', payoffA, candidate[0]), ('payoff B', payoffB, candidate[1])]:
+                report.add('%s %s' % (pair, label), *ksTest(expected, actual), bootstrapDifferences(actual, expected, rng))
+            for r in range(config.rho):
+                report.add('%s contribution A round %d' % (pair, r), *ksTest(contributionA[:, r], candidate[2][:, r]))
+                report.add('%s contribution B round %d' % (pair, r), *ksTest(contributionB[:, r], candidate[3][:, r]))
+    return report
+
+
+def compareExperiences(config, experiments, generations, candidate='batched', processes=None, seed=0):
+    """
+    runs experiments replicas of config with the reference engine and with the candidate one, and compares the
+    distributions of the contribution of each class at each round
+    :return: a Report
+    """
+    reference = sweep.runSweep([config], experiments, generations, processes, seed=seed)
+    tested = sweep.runSweep([config], experiments, generations, processes, seed=seed + 1, engineName=candidate)
+    rng = np.random.default_rng(seed)
+    report = Report('experiences %s alphaR %.2f alphaP %.2f' % (config.riskRoundType.name, config.alphaR, config.alphaP))
+    for name, expected, actual in zip(CLASSES, reference, tested):
+        for r in range(config.rho):
+            report.add('%s round %d' % (name, r), *ksTest(expected[0, :, r], actual[0, :, r]),
+                       bootstrapDifferences(actual[0, :, r], expected[0, :, r], rng))
+    return report
+
+
+def compareLegacy(experiments, generations=None, candidate='batched', processes=None, seed=0, directory='.'):
+    """
+    runs the points of the txt outputs of the first sweeps with the reference engine and with the candidate one, and
+    compares the distributions of the total contribution of the richs and of the poors at each point; the printed
+    values themselves are not compared, main4 no longer reproducing them
+    :return: a Report
+    """
+    parameters = figures.LEGACY_PARAMETERS
+    generations = generations or parameters['generations']
+    base = main4.SimulationConfig(**{name: parameters[name] for name in ('numberOfRichs', 'numberOfPoors', 'rho', 'wealthR',
+                                                                         'wealthP', 'lambdaA', 'games')})
+    configs, names = [], []
+    for name, timing in figures.LEGACY_RESULTS.items():
+        with open(os.path.join(directory, name)) as file:
+            for alphaR, alphaP, _, _ in parseLegacyResults(file.read()):
+                configs.append(dataclasses.replace(base, riskRoundType=main4.RiskRoundType[timing], alphaR=alphaR, alphaP=alphaP))
+                names.append(name.split('.')[0])
+    reference = sweep.runSweep(configs, experiments, generations, processes, seed=seed)
+    tested = sweep.runSweep(configs, experiments, generations, processes, seed=seed + 1, engineName=candidate)
+    rng = np.random.default_rng(seed)
+    report = Report('legacy points')
+    for point, name in enumerate(names):
+        for label, expected, actual in zip(CLASSES, reference, tested):
+            expectedTotals, actualTotals = expected[point].sum(axis=1), actual[point].sum(axis=1)
+            report.add('%s %.1f/%.1f %s' % (name, configs[point].alphaR, configs[point].alphaP, label),
+                       *ksTest(expectedTotals, actualTotals), bootstrapDifferences(actualTotals, expectedTotals, rng))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Checks that a candidate engine simulates the same model as main4')
+    parser.add_argument('check', choices=['games', 'experiences', 'legacy'],
+                        help='games: one game at a time; experiences: whole runs; legacy: the points of the txt outputs')
+    parser.add_argument('--engine', choices=['batched', 'reference'], default='batched',
+                        help='the candidate engine (reference: check the tests themselves, main4 against main4)')
+    parser.add_argument('--experiments', type=int, default=30,
+                        help='replicas of each configuration, at least %d' % MIN_EXPERIMENTS)
+    parser.add_argument('--generations', type=int, default=None, help='generations of each replica')
+    parser.add_argument('--games', type=int, default=20000, help='games of each class pair, for the games check')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (all the cores by default)')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    if arguments.check != 'games' and arguments.experiments < MIN_EXPERIMENTS:
+        parser.error("--experiments must be at least %d for the bootstrap intervals" % MIN_EXPERIMENTS)
+
+    if arguments.check == 'games':
+        reports = [compareGames(main4.SimulationConfig(riskRoundType=main4.RiskRoundType[timing], alphaR=0.7, alphaP=0.5),
+                                arguments.games, arguments.seed) for timing in sweep.TIMINGS]
+    elif arguments.check == 'experiences':
+        reports = [compareExperiences(main4.SimulationConfig(riskRoundType=main4.RiskRoundType[timing], alphaR=alphaR,
+                                                             games=300), arguments.experiments, arguments.generations or 300,
+                                      arguments.engine, arguments.processes, arguments.seed)
+                   for timing in sweep.TIMINGS for alphaR in (0.3, 1.0)]
+    else:
+        reports = [compareLegacy(arguments.experiments, arguments.generations, arguments.engine, arguments.processes,
+                                 arguments.seed)]
+    for report in reports:
+        print(report)
+    sys.exit(1 if any(report.failures() for report in reports) else 0)
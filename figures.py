@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import main4
+import plot
+import sweep
+from store import ResultStore, importLegacyResults
+from sweep import TIMINGS, ALPHAS_R, FIGURE3_ALPHAS_P, FIGURE4_ALPHAS, OMEGAS, ALPHAS, RISK_CURVE_LAMBDAS
+
+MANIFEST = 'figures.json'
+
+# outputs of the first sweeps, split by hand between us (see README)
+LEGACY_RESULTS = {'everyRoundAntoine.txt': 'EveryRound',
+                  'firstRoundPascal.txt': 'FirstRound',
+                  'lastRoundGiulia.txt': 'LastRound',
+                  'randomRoundTristan.txt': 'RandomRound'}
+LEGACY_PARAMETERS = {'numberOfRichs': 20, 'numberOfPoors': 20, 'rho': 4, 'wealthR': 4, 'wealthP': 1, 'lambdaA': 10,
+                     'experiments': 15, 'generations': 1000, 'games': 300}
+
+
+def importLegacy(store, directory='.'):
+    """
+    imports the txt outputs of the first sweeps into the store, once
+    :return: the number of imported sweep points
+    """
+    imported = 0
+    sources = {entry['source'] for entry in store.index.values()}
+    for name, timing in LEGACY_RESULTS.items():
+        path = os.path.join(directory, name)
+        if name not in sources and os.path.exists(path):
+            imported += len(importLegacyResults(store, path, dict(LEGACY_PARAMETERS, riskRoundType=timing)))
+    return imported
+
+
+def panelDigest(store, keys):
+    """
+    returns a digest of the inputs of a panel: the stored results it is built from
+    """
+    digest = hashlib.sha1()
+    for key in keys:
+        digest.update((key or 'missing').encode())
+        digest.update((store.digest(key) if key else '').encode())
+    return digest.hexdigest()
+
+
+def figure3Panel(store, keys):
+    """
+    returns the total contribution over the rounds divided by the wealth, for each alphaR, of richs and poors
+    """
+    rich, poor = np.full(len(keys), np.nan), np.full(len(keys), np.nan)
+    for i, key in enumerate(keys):
+        if key is not None:
+            parameters = store.parameters(key)
+            rich[i] = np.sum(store.mean(key, 'contributionR')) / parameters['wealthR']
+            poor[i] = np.sum(store.mean(key, 'contributionP')) / parameters['wealthP']
+    return rich, poor
+
+
+def figure4Panel(store, key, rho=4):
+    """
+    returns the contribution at each round of richs and poors
+    """
+    if key is None:
+        return np.full(rho, np.nan), np.full(rho, np.nan)
+    return store.mean(key, 'contributionR'), store.mean(key, 'contributionP')
+
+
+def latestCold(store, **fields):
+    """
+    returns the key of the most recent point matching the given fields that was run from random populations and
+    averaged from its first generation, leaving out the warm-started points of a continuation sweep and their cold
+    checks (see sweep.runContinuation and sweep.runColdCheck); None if there is none
+    """
+    keys = [key for key in store.query(**fields) if not {'warmStart', 'burnIn'} & set(store.parameters(key))]
+    return keys[-1] if keys else None
+
+
+def figure3Inputs(store, timing, alphaP):
+    return [latestCold(store, riskRoundType=timing, alphaP=alphaP, alphaR=alphaR, wealthR=4, wealthP=1) for alphaR in ALPHAS_R]
+
+
+def figure4Inputs(store, timing, alphaP, alphaR):
+    return [latestCold(store, riskRoundType=timing, alphaP=alphaP, alphaR=alphaR, wealthR=4, wealthP=1)]
+
+
+def figure2Panel(store, keys):
+    """
+    returns the total contribution over the rounds divided by the wealth Omega, for each alpha, of the whole population
+    """
+    contribution = np.full(len(keys), np.nan)
+    for i, key in enumerate(keys):
+        if key is not None:
+            parameters = store.parameters(key)
+            contributions = np.sum(store.mean(key, 'contributionR')) + np.sum(store.mean(key, 'contributionP'))
+            contribution[i] = contributions / 2 / parameters['wealthR']
+    return contribution, contribution
+
+
+def runFigure2(store, experiments, generations, processes=None, base=main4.SimulationConfig()):
+    """
+    runs, in parallel, the points of the Figure 2 grid that are not in the store yet
+    :return: the amount of points that were run
+    """
+    configs = [config for config in sweep.figure2Grid(base)
+               if latestCold(store, **dict(config.parameters(), experiments=experiments, generations=generations)) is None]
+    if configs:
+        sweep.runSweep(configs, experiments, generations, processes, store, source='figures.py')
+    return len(configs)
+
+
+def figure2(store, cache, base=main4.SimulationConfig()):
+    configs = sweep.figure2Grid(base)
+    panels = []
+    for i, omega in enumerate(OMEGAS):
+        for j, curve in enumerate(sorted(RISK_CURVE_LAMBDAS)):
+            keys = [latestCold(store, **config.parameters()) for config in configs[(i * 3 + j) * len(ALPHAS):(i * 3 + j + 1) * len(ALPHAS)]]
+            panels.append(('omega=%s riskCurve=%s' % (omega, curve), keys, lambda keys: figure2Panel(store, keys)))
+    return updatePanels(store, cache, 'fig2', panels)
+
+
+def updatePanels(store, cache, figure, panels):
+    """
+    recomputes the panels of a figure whose inputs changed since the last run
+    :param cache: the cached panels of every figure, updated in place
+    :param figure: name of the figure
+    :param panels: list of (panel name, input keys, function computing the panel from the keys)
+    :return: the data of every panel in order, and whether any panel was recomputed
+    """
+    cached = cache.setdefault(figure, {})
+    changed = False
+    data = []
+    for name, keys, compute in panels:
+        digest = panelDigest(store, keys)
+        if name not in cached or cached[name]['digest'] != digest:
+            rich, poor = compute(keys)
+            cached[name] = {'digest': digest, 'rich': rich.tolist(), 'poor': poor.tolist()}
+            changed = True
+        data.append((np.array(cached[name]['rich'], dtype=float), np.array(cached[name]['poor'], dtype=float)))
+    return data, changed
+
+
+def figure3(store, cache):
+    panels = []
+    for alphaP in FIGURE3_ALPHAS_P:
+        for timing in TIMINGS:
+            panels.append(('%s alphaP=%s' % (timing, alphaP), figure3Inputs(store, timing, alphaP),
+                           lambda keys: figure3Panel(store, keys)))
+    return updatePanels(store, cache, 'fig3', panels)
+
+
+def figure4(store, cache):
+    panels = []
+    for timing in TIMINGS:
+        for alphaP, alphaR in FIGURE4_ALPHAS:
+            panels.append(('%s alphaP=%s alphaR=%s' % (timing, alphaP, alphaR), figure4Inputs(store, timing, alphaP, alphaR),
+                           lambda keys: figure4Panel(store, keys[0])))
+    return updatePanels(store, cache, 'fig4', panels)
+
+
+def isMissing(name, directory, formats):
+    return any(not os.path.exists(os.path.join(directory, name + '.' + extension)) for extension in formats)
+
+
+def buildFigures(store, directory='.', force=False, show=False, formats=plot.FORMATS, base=main4.SimulationConfig()):
+    """
+    renders every figure of a sweep from the stored results in one process, only redrawing a figure if one of its
+    panels changed or if one of its files is missing
+    :param store: the ResultStore
+    :param directory: where the figures are written
+    :param force: redraw every figure
+    :param show: also show the figures
+    :param formats: the file formats to write (png, svg, pdf)
+    :param base: the SimulationConfig from which the Figure 2 grid is derived
+    :return: the names of the redrawn figures
+    """
+    manifestPath = os.path.join(store.directory, MANIFEST)
+    cache = {}
+    if os.path.exists(manifestPath) and not force:
+        with open(manifestPath) as file:
+            cache = json.load(file)
+
+    redrawn = []
+    data, changed = figure3(store, cache)
+    if changed or force or isMissing('fig3', directory, formats):
+        fig = plot.variationOfLossEndowmentForRichAndPoorPlayer([rich for rich, _ in data], [poor for _, poor in data], show=show)
+        plot.saveFigure(fig, 'fig3', directory, formats)
+        redrawn.append('fig3')
+    data, changed = figure4(store, cache)
+    if changed or force or isMissing('fig4', directory, formats):
+        fig = plot.contributionsForDifferentTimingsOfPotentialLosses([rich for rich, _ in data], [poor for _, poor in data], show=show)
+        plot.saveFigure(fig, 'fig4', directory, formats)
+        redrawn.append('fig4')
+    data, changed = figure2(store, cache, base)
+    if any(np.isfinite(contribution).any() for contribution, _ in data) and (changed or force or isMissing('fig2', directory, formats)):
+        x = np.array(ALPHAS)
+        riskCurves = [main4.RISK_CURVES[curve](x, RISK_CURVE_LAMBDAS[curve], 1) for curve in sorted(RISK_CURVE_LAMBDAS)]
+        curves = len(RISK_CURVE_LAMBDAS)
+        omegas = [[contribution for contribution, _ in data[i * curves:(i + 1) * curves]] for i in range(len(OMEGAS))]
+        fig = plot.effectOfFractionLossOnContributions(riskCurves, *omegas, show=show)
+        plot.saveFigure(fig, 'fig2', directory, formats)
+        redrawn.append('fig2')
+    if force or isMissing('riskcurve', directory, formats):
+        plot.saveFigure(plot.riskCurve(show=show), 'riskcurve', directory, formats)
+        redrawn.append('riskcurve')
+
+    with open(manifestPath + '.tmp', 'w') as file:
+        json.dump(cache, file)
+    os.replace(manifestPath + '.tmp', manifestPath)
+    return redrawn
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerates Figure 3 and Figure 4 from the result store')
+    parser.add_argument('--results', default='results', help='directory of the result store')
+    parser.add_argument('--output', default='.', help='directory of the figures')
+    parser.add_argument('--force', action='store_true', help='redraw every figure')
+    parser.add_argument('--formats', nargs='+', default=list(plot.FORMATS), help='file formats: png, svg, pdf')
+    parser.add_argument('--show', action='store_true', help='show the figures, otherwise nothing is displayed (Agg)')
+    parser.add_argument('--figure2', action='store_true', help='first run the missing points of the Figure 2 grid')
+    parser.add_argument('--experiments', type=int, default=3, help='replicas of each point of the Figure 2 grid')
+    parser.add_argument('--generations', type=int, default=2000, help='generations of each replica of the Figure 2 grid')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (all the cores by default)')
+    arguments = parser.parse_args()
+
+    if not arguments.show:
+        plot.useHeadless()
+
+    store = ResultStore(arguments.results)
+    print("Imported", importLegacy(store), "sweep points")
+    if arguments.figure2:
+        print("Ran", runFigure2(store, arguments.experiments, arguments.generations, arguments.processes), "sweep points")
+    print("Redrawn", buildFigures(store, arguments.output, arguments.force, arguments.show, arguments.formats))
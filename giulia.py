@@ -1,205 +1,10 @@
-import plot
+import figures
+from store import ResultStore
 
 if __name__ == '__main__':
-    # plot 3
-    # everyRound
-    everyRichP1 = [sum([2.01746779, 0.13628167, 0.05228322, 0.03818052])/4,
-                   sum([1.99179502, 0.15212818, 0.05559993, 0.03244738])/4,
-                   sum([1.92814807, 0.16133465, 0.05643638, 0.03181141])/4,
-                   sum([2.05523789, 0.19081642, 0.06529323, 0.0363878])/4,
-                   sum([2.01702896, 0.23323301, 0.0772147, 0.04982232])/4,
-                   sum([1.92449605, 0.25726662, 0.1036144, 0.06300547])/4,
-                   sum([1.95762721, 0.32003825, 0.14115468, 0.07300969])/4,
-                   sum([1.35914525, 0.36943232, 0.15631481, 0.1480005])/4,
-                   sum([0.81183257, 0.38404055, 0.21531764, 0.1406374])/4,
-                   sum([0.56343389, 0.3028301, 0.18916325, 0.16829975])/4]
-    everyRichP1.reverse()  # oups
-    everyRichP05 = [sum([2.00412559, 0.13092196, 0.05258218, 0.03229034]) / 4,
-                   sum([1.91261837, 0.1575222, 0.06112466, 0.03219328]) / 4,
-                   sum([1.99224285, 0.15936151, 0.05584028, 0.03555872]) / 4,
-                   sum([1.93052038, 0.18835085, 0.07227125, 0.03561084]) / 4,
-                   sum([1.88691461, 0.23375982, 0.07967655, 0.04590515]) / 4,
-                   sum([1.95676587, 0.3053535, 0.095913, 0.0632291]) / 4,
-                   sum([1.87968322, 0.33589358, 0.13841763, 0.07904494]) / 4,
-                   sum([1.48002659, 0.33972346, 0.20896931, 0.12222167]) / 4,
-                   sum([0.86474584, 0.3959626, 0.24638306, 0.1657421]) / 4,
-                   sum([0.46437411, 0.28673461, 0.23360872, 0.19673863]) / 4]
-    everyRichP05.reverse()  # oups
-    everyPoorP1 = [sum([0.49946635, 0.05464247, 0.02400596, 0.01383971]),
-                   sum([0.51526288, 0.05589034, 0.02442921, 0.01327907]),
-                   sum([0.4969161, 0.05585599, 0.02283203, 0.01354754]),
-                   sum([0.50212809, 0.06129855, 0.02341954, 0.01434626]),
-                   sum([0.49329739, 0.06117322, 0.02340086, 0.01397096]),
-                   sum([0.49901013, 0.05243953, 0.02063225, 0.01402825]),
-                   sum([0.49590724, 0.05661833, 0.02179834, 0.01201761]),
-                   sum([0.47830162, 0.040557, 0.01475809, 0.00855574]),
-                   sum([0.48382996, 0.03134637, 0.01150605, 0.00620303]),
-                   sum([0.48919315, 0.02672079, 0.00988288, 0.00585398])]
-    everyPoorP1.reverse()  # oups
-    everyPoorP05 = [sum([0.48959825, 0.08484904, 0.03816254, 0.01828957]),
-                    sum([0.47939374, 0.08148349, 0.03668483, 0.01590148]),
-                    sum([0.48920098, 0.09177319, 0.03396733, 0.01844315]),
-                    sum([0.48062025, 0.08840591, 0.03366765, 0.0167037]),
-                    sum([0.47224466, 0.08469339, 0.0349989, 0.01640281]),
-                    sum([0.51027022, 0.07753544, 0.03346534, 0.01734602]),
-                    sum([0.51590274, 0.07675874, 0.03040592, 0.01714214]),
-                    sum([0.49246559, 0.0794771, 0.02817059, 0.01466803]),
-                    sum([0.49614013, 0.06872948, 0.02402827, 0.01323789]),
-                    sum([0.50063305, 0.05361223, 0.02025555, 0.00909939])]
-    everyPoorP05.reverse()  # oups
-
-    # firstRound
-    firstRichP1 = [sum([0.2123459, 0.21953781, 0.17687368, 0.18325377])/4,
-                   sum([0.24510545, 0.16256451, 0.19313591, 0.16724665])/4,
-                   sum([0.2560184, 0.19837026, 0.16715465, 0.16518457])/4,
-                   sum([0.36037989, 0.16828438, 0.17650555, 0.15826789])/4,
-                   sum([0.42339107, 0.15961122, 0.15786106, 0.12770681])/4,
-                   sum([0.46021435, 0.16074263, 0.14006775, 0.13063626])/4,
-                   sum([0.98198786, 0.11909119, 0.13714913, 0.1076372 ])/4,
-                   sum([1.68865731, 0.11371756, 0.12030531, 0.11282387])/4,
-                   sum([1.97053407, 0.09495022, 0.09684756, 0.0731725 ])/4,
-                   sum([2.17352966, 0.08278341, 0.08242475, 0.07303144])/4]
-    firstRichP05 = [sum([0.22030902, 0.22184163, 0.20626739, 0.16618615]) / 4,
-                   sum([0.31881392, 0.19988107, 0.18165592, 0.15393602]) / 4,
-                   sum([0.27114573, 0.18558589, 0.17252313, 0.17268836]) / 4,
-                   sum([0.34317902, 0.14714516, 0.14984824, 0.12022285]) / 4,
-                   sum([0.41011806, 0.1427082, 0.18285872, 0.10264555]) / 4,
-                   sum([0.45286232, 0.15859717, 0.10758677, 0.11277957]) / 4,
-                   sum([0.93382946, 0.11815803, 0.12060246, 0.10650983]) / 4,
-                   sum([1.50782417, 0.14534644, 0.08369427, 0.10950443]) / 4,
-                   sum([1.93249584, 0.08295885, 0.08407006, 0.07330371]) / 4,
-                   sum([2.2906469,  0.08601303, 0.05774371, 0.07631133]) / 4]
-    firstPoorP1 = [sum([0.44760008, 0.01852699, 0.01532653, 0.01318254]),
-                   sum([0.45502653, 0.01725376, 0.01604071, 0.01202867]),
-                   sum([0.43056105, 0.018873, 0.01591312, 0.01094524]),
-                   sum([0.42754867, 0.01864653, 0.01627725, 0.01254257]),
-                   sum([0.418994, 0.01889098, 0.0137853, 0.01541545]),
-                   sum([0.42855924, 0.02027231, 0.01759123, 0.0133045]),
-                   sum([0.40475586, 0.0212963, 0.01846504, 0.01955231]),
-                   sum([0.4001606, 0.03786944, 0.02833315, 0.02405952]),
-                   sum([0.37496282, 0.03585406, 0.03322614, 0.02983073]),
-                   sum([0.36284895, 0.03628879, 0.0395529, 0.02909777])]
-    firstPoorP05 = [sum([0.19959929, 0.0779669, 0.06979874, 0.06372899]),
-                    sum([0.21253344, 0.0961641, 0.07466748, 0.05981553]),
-                    sum([0.20355255, 0.09210716, 0.076539, 0.06021715]),
-                    sum([0.22294901, 0.08823787, 0.06887981, 0.06836348]),
-                    sum([0.19721664, 0.0744765, 0.08387989, 0.05767148]),
-                    sum([0.22332294, 0.08431468, 0.0739843, 0.0639776]),
-                    sum([0.2143729, 0.09298036, 0.0738634, 0.06898833]),
-                    sum([0.21421689, 0.0792299, 0.09561803, 0.06324669]),
-                    sum([0.22712174, 0.094011, 0.08930248, 0.06497108]),
-                    sum([0.20981563, 0.09493418, 0.08278433, 0.07369178])]
-
-    # lastRound
-    lastRichP1 = [sum([0.23402357, 0.26132539, 0.2045749, 0.2293573])/4,
-                   sum([0.31986195, 0.26305219, 0.25733963, 0.23510337])/4,
-                   sum([0.26231445, 0.299914, 0.27819732, 0.24456039])/4,
-                   sum([0.28874547, 0.28221844, 0.27694471, 0.28565315])/4,
-                   sum([0.34321861, 0.33099997, 0.37884217, 0.37710474])/4,
-                   sum([0.40474386, 0.4277978, 0.44428487, 0.45728377])/4,
-                   sum([0.48376441, 0.50085451, 0.53042193, 0.51685494])/4,
-                   sum([0.5201742, 0.52941736, 0.59143821, 0.54593553])/4,
-                   sum([0.66836467, 0.59335882, 0.53525893, 0.50498152])/4,
-                   sum([0.5409869, 0.67096385, 0.4966662, 0.64950978])/4]
-    lastRichP05 = [sum([0.24941939, 0.21164317, 0.25337342, 0.21453191]) / 4,
-                   sum([0.30059976, 0.21965257, 0.22851488, 0.18489227]) / 4,
-                   sum([0.25967178, 0.26712676, 0.25644609, 0.26866832]) / 4,
-                   sum([0.29315103, 0.28953989, 0.31401012, 0.28001201]) / 4,
-                   sum([0.35404554, 0.40242166, 0.3796114, 0.34689459]) / 4,
-                   sum([0.40393056, 0.45797374, 0.46598528, 0.45610475]) / 4,
-                   sum([0.5351536, 0.47127573, 0.5513921, 0.49712685]) / 4,
-                   sum([0.57807258, 0.60061908, 0.56034981, 0.46673064]) / 4,
-                   sum([0.58124893, 0.62832213, 0.55202339, 0.54616465]) / 4,
-                   sum([0.75533393, 0.52635787, 0.59893746, 0.53171982]) / 4]
-    lastPoorP1 = [sum([0.2250048, 0.18744924, 0.16271189, 0.12931418]),
-                   sum([0.22874074, 0.20654931, 0.15464794, 0.12460708]),
-                   sum([0.21318944, 0.20647935, 0.16622042, 0.11872629]),
-                   sum([0.21699525, 0.21040115, 0.16004908, 0.12848882]),
-                   sum([0.20781621, 0.18140024, 0.16727878, 0.12290966]),
-                   sum([0.20521814, 0.19115137, 0.15778933, 0.12628468]),
-                   sum([0.19677947, 0.17482622, 0.16712652, 0.13535524]),
-                   sum([0.19510238, 0.16681998, 0.1706993,  0.11285315]),
-                   sum([0.17259, 0.19487759, 0.15806609, 0.13296501]),
-                   sum([0.18852652, 0.17389035, 0.17290095, 0.12385895])]
-    lastPoorP05 = [sum([0.1641008, 0.15663886, 0.15580454, 0.13840757]),
-                    sum([0.17008861, 0.1691845, 0.1519569, 0.1223822]),
-                    sum([0.16821632, 0.15581388, 0.15222767, 0.12335349]),
-                    sum([0.160857, 0.15970286, 0.15807606, 0.11922217]),
-                    sum([0.16770438, 0.16051202, 0.15080057, 0.12287672]),
-                    sum([0.15594753, 0.16331985, 0.14758284, 0.11606205]),
-                    sum([0.15710294, 0.16130284, 0.15029904, 0.11376228]),
-                    sum([0.15231773, 0.16974041, 0.13806707, 0.12533009]),
-                    sum([0.14191432, 0.16092942, 0.13992413, 0.11583745]),
-                    sum([0.1318072, 0.16093453, 0.12628756, 0.1437456])]
-
-
-    # randomRound
-    randomRichP1 = [sum([0.2884806, 0.22180287, 0.16325301, 0.18384487])/4,
-                   sum([0.27709033, 0.1894326, 0.21440977, 0.20920904])/4,
-                   sum([0.30343232, 0.27117945, 0.20220419, 0.17856087])/4,
-                   sum([0.36594904, 0.25157331, 0.21635684, 0.2000951])/4,
-                   sum([0.45011737, 0.25090024, 0.23127405, 0.16356941])/4,
-                   sum([0.49517037, 0.27573876, 0.19797812, 0.12454731])/4,
-                   sum([0.80956565, 0.36235356, 0.20820187, 0.15130398])/4,
-                   sum([1.36584836, 0.31224518, 0.19503214, 0.11214984])/4,
-                   sum([1.50808212, 0.29278877, 0.18026011, 0.12087895])/4,
-                   sum([1.73210086, 0.27170541, 0.16413342, 0.08643499])/4]
-    randomRichP05 = [sum([0.23500339, 0.19960708, 0.19259489, 0.19371915]) / 4,
-                   sum([0.26092968, 0.22402823, 0.19362715, 0.16965306]) / 4,
-                   sum([0.2569334, 0.21228355, 0.24307616, 0.19476599]) / 4,
-                   sum([0.32445155, 0.21921754, 0.21399794, 0.15232212]) / 4,
-                   sum([0.36617885, 0.326185, 0.19418769, 0.13470632]) / 4,
-                   sum([0.47640065, 0.33892939, 0.19282192, 0.1732842]) / 4,
-                   sum([0.84562419, 0.32446638, 0.22959917, 0.14462409]) / 4,
-                   sum([1.30317961, 0.32127497, 0.17733758, 0.11768225]) / 4,
-                   sum([1.50559526, 0.34659958, 0.16015092, 0.10443256]) / 4,
-                   sum([1.81154478, 0.27129056, 0.15272023, 0.09237492]) / 4]
-    randomPoorP1 = [sum([0.34738676, 0.14033197, 0.07042505, 0.03283788]),
-                   sum([0.31865778, 0.13263426, 0.06680806, 0.03946844]),
-                   sum([0.34210907, 0.14476272, 0.06674667, 0.03341997]),
-                   sum([0.32270039, 0.1361655, 0.06886697, 0.03247639]),
-                   sum([0.29813936, 0.14733983, 0.0681552, 0.03721211]),
-                   sum([0.30673522, 0.14892286, 0.07029637, 0.03636054]),
-                   sum([0.31857164, 0.13398362, 0.07558667, 0.04092365]),
-                   sum([0.28403092, 0.13679429, 0.0762391, 0.04719168]),
-                   sum([0.29739015, 0.14071032, 0.07395537, 0.04903835]),
-                   sum([0.27635248, 0.14092138, 0.08252229, 0.04651932])]
-    randomPoorP05 = [sum([0.18754895, 0.15787389, 0.10674837, 0.07399768]),
-                    sum([0.20146704, 0.14639532, 0.09781974, 0.07969617]),
-                    sum([0.18082432, 0.16019355, 0.09605238, 0.07427358]),
-                    sum([0.19946725, 0.14349137, 0.10179035, 0.07001099]),
-                    sum([0.17737902, 0.15090771, 0.11552558, 0.07014792]),
-                    sum([0.20194565, 0.14150041, 0.11468827, 0.08015195]),
-                    sum([0.18763781, 0.154472, 0.10607122, 0.08114361]),
-                    sum([0.19590409, 0.13870953, 0.10742571, 0.08135107]),
-                    sum([0.20882482, 0.12532372, 0.10720818, 0.0892877]),
-                    sum([0.20085289, 0.14280916, 0.10409831, 0.07710797])]
-
-    plot.variationOfLossEndowmentForRichAndPoorPlayer([everyRichP1, firstRichP1, lastRichP1, randomRichP1] +
-                                                      [everyRichP05, firstRichP05, lastRichP05, randomRichP05],
-                                                      [everyPoorP1, firstPoorP1, lastPoorP1, randomPoorP1] +
-                                                      [everyPoorP05, firstPoorP05, lastPoorP05, randomPoorP05])
-
-    # plot 4
-    everyRich = [[2.01746779, 0.13628167, 0.05228322, 0.03818052], [1.92814807, 0.16133465, 0.05643638, 0.03181141],
-                 [1.99224285, 0.15936151, 0.05584028, 0.03555872], [1.95676587, 0.3053535, 0.095913, 0.0632291]]
-    everyPoor = [[0.49946635, 0.05464247, 0.02400596, 0.01383971], [0.4969161, 0.05585599, 0.02283203, 0.01354754],
-                 [0.48920098, 0.09177319, 0.03396733, 0.01844315], [0.51027022, 0.07753544, 0.03346534, 0.01734602]]
-    firstRich = [[2.17352966, 0.08278341, 0.08242475, 0.07303144], [1.68865731, 0.11371756, 0.12030531, 0.11282387],
-                 [1.50782417, 0.14534644, 0.08369427, 0.10950443], [0.41011806, 0.1427082, 0.18285872, 0.10264555]]
-    firstPoor = [[0.36284895, 0.03628879, 0.0395529, 0.02909777], [0.4001606, 0.03786944, 0.02833315, 0.02405952],
-                 [0.21421689, 0.0792299, 0.09561803, 0.06324669], [0.19721664,0.0744765, 0.08387989, 0.05767148]]
-    lastRich = [[0.5409869, 0.67096385, 0.4966662, 0.64950978], [0.5201742, 0.52941736, 0.59143821, 0.54593553],
-                 [0.57807258, 0.60061908, 0.56034981, 0.46673064], [0.35404554, 0.40242166, 0.3796114, 0.34689459]]
-    lastPoor = [[0.18852652, 0.17389035, 0.17290095, 0.12385895], [0.19510238, 0.16681998, 0.1706993, 0.11285315],
-                 [0.15231773, 0.16974041, 0.13806707, 0.12533009], [0.16770438, 0.16051202, 0.15080057, 0.12287672]]
-    randomRich = [[1.73210086, 0.27170541, 0.16413342, 0.08643499], [1.36584836, 0.31224518, 0.19503214, 0.11214984],
-                 [1.30317961, 0.32127497, 0.17733758, 0.11768225], [0.36617885, 0.326185, 0.19418769, 0.13470632]]
-    randomPoor = [[0.27635248, 0.14092138, 0.08252229, 0.04651932], [0.28403092, 0.13679429, 0.0762391, 0.04719168],
-                 [0.19590409, 0.13870953, 0.10742571, 0.08135107], [0.17737902, 0.15090771, 0.11552558, 0.07014792]]
-    plot.contributionsForDifferentTimingsOfPotentialLosses(everyRich + firstRich + lastRich + randomRich,
-                                                           everyPoor + firstPoor + lastPoor + randomPoor)
-
-    plot.riskCurve()
+    # plot 3, plot 4 and the risk curve, from the result store (the txt outputs are imported the first time)
+    store = ResultStore('results')
+    figures.importLegacy(store)
+    figures.buildFigures(store, show=True, force=True)
 
     print('Hello Giulia')
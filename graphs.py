@@ -0,0 +1,152 @@
+import time
+import numpy as np
+import engine
+
+GRAPHS = ('lattice', 'smallWorld', 'scaleFree')
+
+
+class Graph:
+    """
+    undirected interaction graph in CSR form: the neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+    """
+
+    def __init__(self, nodes, edgesA, edgesB):
+        """
+        :param edgesA, edgesB: the two ends of every edge, each edge given once; loops and duplicates are removed
+        """
+        edgesA, edgesB = np.minimum(edgesA, edgesB), np.maximum(edgesA, edgesB)
+        keep = edgesA != edgesB
+        edges = np.unique(edgesA[keep].astype(np.int64) * nodes + edgesB[keep])
+        self.nodes = nodes
+        self.edgesA, self.edgesB = edges // nodes, edges % nodes
+        sources = np.concatenate([self.edgesA, self.edgesB])
+        targets = np.concatenate([self.edgesB, self.edgesA])
+        order = np.argsort(sources, kind='stable')
+        self.indices = targets[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=nodes))])
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+
+def lattice(nodes):
+    """
+    square lattice with periodic boundaries, 4 neighbours per node
+    """
+    side = int(round(np.sqrt(nodes)))
+    if side * side != nodes:
+        raise ValueError("a lattice needs a square amount of individuals, not %d" % nodes)
+    node = np.arange(nodes)
+    row, column = divmod(node, side)
+    right = row * side + (column + 1) % side
+    down = ((row + 1) % side) * side + column
+    return Graph(nodes, np.concatenate([node, node]), np.concatenate([right, down]))
+
+
+def smallWorld(nodes, degree, rewiring, rng):
+    """
+    Watts-Strogatz graph: ring where every node is linked to its degree nearest nodes, then each edge is rewired to a
+    random node with probability rewiring
+    """
+    node = np.repeat(np.arange(nodes), degree // 2)
+    other = (node + np.tile(np.arange(1, degree // 2 + 1), nodes)) % nodes
+    rewired = rng.random(len(node)) < rewiring
+    other[rewired] = rng.integers(0, nodes, np.count_nonzero(rewired))
+    return Graph(nodes, node, other)
+
+
+def scaleFree(nodes, degree, rng):
+    """
+    Barabasi-Albert graph: each new node is linked to degree / 2 nodes chosen proportionally to their degree, i.e. to
+    the end of a random edge among the edges of the nodes before it. All the edges are drawn at once: an edge drawing
+    the new node of an earlier edge knows its target, one drawing the old end of an earlier edge takes the same target,
+    which is resolved by pointer jumping along these references
+    """
+    links = max(degree // 2, 1)
+    first = links + 1  # linked to every node before it
+    if nodes <= first:
+        raise ValueError("a scale-free graph of degree %d needs more than %d individuals, not %d" % (degree, first, nodes))
+    sources = np.concatenate([np.full(first, first), np.repeat(np.arange(first + 1, nodes), links)]).astype(np.int64)
+    edges = np.arange(len(sources))
+    targets = np.arange(len(sources))
+    pointer = edges.copy()  # pointer[e] != e: the target of e is the target of pointer[e]
+    before = first + (sources[first:] - first - 1) * links  # the edges of the nodes before the source
+    edge, oldEnd = np.divmod(rng.integers(0, 2 * before), 2)
+    targets[first:] = sources[edge]
+    pointer[first:] = np.where(oldEnd == 1, edge, edges[first:])
+    pending = np.flatnonzero(pointer != edges)
+    while len(pending):
+        following = pointer[pending]
+        resolved = pointer[following] == following
+        targets[pending[resolved]] = targets[following[resolved]]
+        pointer[pending] = np.where(resolved, pending, pointer[following])
+        pending = pending[~resolved]
+    return Graph(nodes, sources, targets)
+
+
+def buildGraph(config, nodes, rng):
+    if config.graph == 'lattice':
+        return lattice(nodes)
+    if config.graph == 'smallWorld':
+        return smallWorld(nodes, config.graphDegree, config.graphRewiring, rng)
+    if config.graph == 'scaleFree':
+        return scaleFree(nodes, config.graphDegree, rng)
+    raise ValueError("unknown graph %r" % config.graph)
+
+
+def localSelect(strategies, fitness, classOf, graph, rng):
+    """
+    every individual copies its own strategy or the one of a neighbour of its class, chosen proportionally to the
+    fitness; the weights of the neighbours are gathered along the CSR arrays, and one draw in their cumulated sum
+    serves every individual at once
+    """
+    weights = fitness[graph.indices] * (classOf[graph.indices] == np.repeat(classOf, graph.degrees()))
+    cumulated = np.concatenate([[0], np.cumsum(weights)])
+    before, neighbours = cumulated[graph.indptr[:-1]], cumulated[graph.indptr[1:]] - cumulated[graph.indptr[:-1]]
+    draws = rng.random(graph.nodes) * (fitness + neighbours)
+    model = np.arange(graph.nodes)
+    imitating = np.flatnonzero(draws >= fitness)
+    position = np.searchsorted(cumulated, before[imitating] + draws[imitating] - fitness[imitating], side='right') - 1
+    position = np.clip(position, graph.indptr[imitating], graph.indptr[imitating + 1] - 1)
+    model[imitating] = graph.indices[position]
+    return strategies[model]
+
+
+def evolveOnGraph(config, generations, rng, stats=None, progress=None, common=None):
+    """
+    evolves a population living on the nodes of config.graph (the classes are placed at random): at each generation
+    one game is played along every edge, then every individual imitates locally (localSelect) and mutates
+    :param rng: the np.random.Generator of the experience
+    :param common: if given, (seed, replica) of the common random numbers used instead of rng, see engine.commonStreams
+    :return: the contribution of each class at each round averaged over the generations; size (classes, rho)
+    """
+    if config.groupSize != 2 or config.pairing != 'random':
+        raise ValueError("the games of a graph are played along its edges, by pairs: groupSize must be 2 and pairing "
+                         "'random', not %d and %r" % (config.groupSize, config.pairing))
+    sizes, wealth, alphas = engine.getClasses(config)
+    rngs = dict.fromkeys(engine.PURPOSES, rng) if common is None else engine.commonStreams(*common, 0)
+    classOf = rngs['init'].permutation(np.repeat(np.arange(len(sizes)), sizes))
+    graph = buildGraph(config, len(classOf), rngs['init'])
+    wealthOf = engine.initWealth(config, classOf, wealth, rngs['init'])
+    strategies = engine.initStrategies(wealthOf, config.rho, rngs['init'])
+    individualWealth = None if config.wealthSpread == 0 or config.wealthDistribution == 'constant' else wealthOf
+    contributionTotal = np.zeros((len(sizes), config.rho))
+    for i in range(generations):
+        if common is not None:
+            rngs = engine.commonStreams(*common, i)
+        fitness, contribution = engine.playPairs(config, strategies, classOf, wealth, alphas, individualWealth,
+                                                 graph.edgesA, graph.edgesB, rngs, stats)
+        contributionTotal += contribution
+
+        start = time.perf_counter()
+        strategies = localSelect(strategies, fitness, classOf, graph, rngs['selection'])
+        if stats:
+            start = stats.lap('selection', start)
+        mutations = engine.mutate(strategies, wealthOf, config.mu, config.sigma, rngs['mutation'])
+        if stats:
+            stats.lap('mutation', start)
+            stats.count('mutations', mutations)
+            stats.count('generations')
+        if progress:
+            progress(i + 1, len(graph.edgesA))
+    return contributionTotal / generations
@@ -0,0 +1,122 @@
+import argparse
+import math
+import numpy as np
+import engine
+import main4
+import sweep
+
+
+def wilsonInterval(successes, trials, z=1.96):
+    """
+    returns the Wilson score interval of a proportion (95% by default)
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    proportion = successes / trials
+    center = (proportion + z * z / (2 * trials)) / (1 + z * z / trials)
+    spread = z * math.sqrt(proportion * (1 - proportion) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return max(center - spread, 0.0), min(center + spread, 1.0)
+
+
+def runTrials(config, resident, mutant, mutantClass, trials, maxGenerations, rng, stats=None):
+    """
+    runs independent invasion trials in lockstep: in each one, a single individual of mutantClass plays mutant and all
+    the others play the resident strategy of their class; the selection of engine.select is applied without mutation
+    until the mutant is fixed in its class or extinct. The trials still running are kept along one batch axis, the
+    games of all of them being played in the same class-pair batches
+    :param resident: the strategy of each class; size (classes, rho, 3)
+    :param mutant: the strategy of the mutant; size (rho, 3)
+    :return: the amount of trials where the mutant was fixed, extinct, and still undecided after maxGenerations, and the
+        total amount of generations run
+    """
+    sizes, wealth, alphas = engine.getClasses(config)
+    classOf = np.repeat(np.arange(len(sizes)), sizes)
+    individuals, first = len(classOf), sizes[:mutantClass].sum()
+    rngs = dict.fromkeys(engine.PURPOSES, rng)
+    mutants = np.zeros((trials, individuals), dtype=bool)
+    mutants[:, first] = True
+    fixed = extinct = generations = 0
+    for _ in range(maxGenerations):
+        if len(mutants) == 0:
+            break
+        count = len(mutants)
+        flags = mutants.ravel()
+        strategies = np.where(flags[:, None, None], mutant[None], resident[np.tile(classOf, count)])
+        # the trials side by side form one population whose games never mix two trials
+        offsets = np.repeat(np.arange(count) * individuals, config.games)
+        playerA = rng.integers(0, individuals, count * config.games)
+        playerB = rng.integers(0, individuals - 1, count * config.games)
+        playerB += playerB >= playerA
+        fitness, _ = engine.playPairs(config, strategies, np.tile(classOf, count), wealth, alphas, None,
+                                      playerA + offsets, playerB + offsets, rngs, stats)
+        mutants = engine.select(flags, fitness, np.tile(sizes, count), rng).reshape(count, individuals)
+        generations += count
+
+        inClass = mutants[:, first:first + sizes[mutantClass]].sum(axis=1)
+        done = (inClass == 0) | (inClass == sizes[mutantClass])
+        fixed += int(np.count_nonzero(inClass == sizes[mutantClass]))
+        extinct += int(np.count_nonzero(inClass == 0))
+        mutants = mutants[~done]
+    return fixed, extinct, len(mutants), generations
+
+
+def fixationProbability(config, resident, mutant, mutantClass=0, trials=10000, batch=1000, maxGenerations=10000, seed=0):
+    """
+    estimates the probability that a single mutant takes over its class, by batches of trials run in lockstep
+    :return: dictionary with the counts, the probability among the decided trials, its 95% Wilson interval, the
+        probability of a neutral mutant (1 / size of the class) and the mean generations of a trial
+    """
+    rng = np.random.default_rng(seed)
+    fixed = extinct = undecided = generations = 0
+    for start in range(0, trials, batch):
+        counts = runTrials(config, resident, mutant, mutantClass, min(batch, trials - start), maxGenerations, rng)
+        fixed, extinct, undecided, generations = (total + count for total, count in
+                                                  zip((fixed, extinct, undecided, generations), counts))
+    decided = fixed + extinct
+    return {'fixed': fixed, 'extinct': extinct, 'undecided': undecided,
+            'probability': fixed / decided if decided else float('nan'),
+            'interval': tuple(float(bound) for bound in wilsonInterval(fixed, decided)),
+            'neutral': 1 / int(engine.getClasses(config)[0][mutantClass]),
+            'generations': generations / trials}
+
+
+def constantStrategy(fractions, wealth, rho):
+    """
+    returns the strategy playing the same (tau, a, b) at every round, a and b given as fractions of the wealth
+    :return: size (rho, 3)
+    """
+    tau, a, b = fractions
+    return np.tile([tau, a * wealth, b * wealth], (rho, 1))
+
+
+def parseFractions(text):
+    return tuple(float(value) for value in text.split(','))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fixation probability of a mutant strategy under each risk timing')
+    parser.add_argument('--resident', type=parseFractions, default=(0.5, 0.1, 0.0),
+                        help='tau,a,b of the residents of every class, a and b as fractions of the wealth')
+    parser.add_argument('--mutant', type=parseFractions, default=(0.5, 0.3, 0.1), help='tau,a,b of the mutant')
+    parser.add_argument('--mutant-class', choices=['richs', 'poors'], default='richs')
+    parser.add_argument('--alpha-r', type=float, default=1.0)
+    parser.add_argument('--alpha-p', type=float, default=1.0)
+    parser.add_argument('--games', type=int, default=200, help='games per generation of each trial')
+    parser.add_argument('--trials', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=1000, help='trials run in lockstep')
+    parser.add_argument('--max-generations', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    mutantClass = 0 if arguments.mutant_class == 'richs' else 1
+    for timing in sweep.TIMINGS:
+        config = main4.SimulationConfig(riskRoundType=main4.RiskRoundType[timing], alphaR=arguments.alpha_r,
+                                        alphaP=arguments.alpha_p, games=arguments.games)
+        _, wealth, _ = engine.getClasses(config)
+        resident = np.array([constantStrategy(arguments.resident, classWealth, config.rho) for classWealth in wealth])
+        mutant = constantStrategy(arguments.mutant, wealth[mutantClass], config.rho)
+        result = fixationProbability(config, resident, mutant, mutantClass, arguments.trials, arguments.batch,
+                                     arguments.max_generations, arguments.seed)
+        print("%-11s fixation %.4f [%.4f, %.4f] (neutral %.4f) | %d fixed, %d extinct, %d undecided, %.1f generations"
+              % (timing, result['probability'], *result['interval'], result['neutral'], result['fixed'], result['extinct'],
+                 result['undecided'], result['generations']))
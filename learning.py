@@ -0,0 +1,100 @@
+import time
+import numpy as np
+import engine
+
+
+def getActions(levels):
+    """
+    returns every strategy a learner can choose at a round: tau, and a and b as fractions of its wealth, each taking
+    levels values in [0, 1]
+    :return: size (levels ** 3, 3)
+    """
+    values = np.linspace(0, 1, levels)
+    return np.stack(np.meshgrid(values, values, values, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def choose(probabilities, rng):
+    """
+    draws one action per row of a table of probabilities
+    :param probabilities: size (..., actions), each row summing to 1
+    :return: the index of the chosen actions; size (...)
+    """
+    cumulated = np.cumsum(probabilities, axis=-1)
+    draws = rng.random(probabilities.shape[:-1] + (1,)) * cumulated[..., -1:]
+    return np.minimum((cumulated < draws).sum(axis=-1), probabilities.shape[-1] - 1)
+
+
+def policy(values, config):
+    """
+    returns the probability of each action of each learner at each round
+    :param values: Q-values (qLearning) or propensities (rothErev); size (learners, rho, actions)
+    """
+    if config.dynamics == 'qLearning':
+        best = values == values.max(axis=-1, keepdims=True)
+        greedy = best / best.sum(axis=-1, keepdims=True)
+        return (1 - config.exploration) * greedy + config.exploration / values.shape[-1]
+    if config.dynamics == 'rothErev':
+        return values / values.sum(axis=-1, keepdims=True)
+    raise ValueError("unknown learning dynamics %r" % config.dynamics)
+
+
+def update(values, chosen, reward, config):
+    """
+    updates the values of the chosen actions of every learner at every round at once with the mean payoff of the
+    learner over the last batch of games
+    :param chosen: the actions played; size (learners, rho)
+    :param reward: the reward of each learner, nan for the learners that did not play
+    """
+    learners = np.flatnonzero(~np.isnan(reward))
+    rounds = np.arange(values.shape[1])
+    index = (learners[:, None], rounds[None, :], chosen[learners])
+    if config.dynamics == 'qLearning':
+        values[index] += config.learningRate * (reward[learners, None] - values[index])
+    else:
+        values[learners] *= 1 - config.learningRate
+        values[index] += np.maximum(reward[learners, None], 0) + 1e-6
+
+
+def learn(config, episodes, rng, stats=None, progress=None, common=None):
+    """
+    learning dynamics instead of selection and mutation: every individual keeps a value for each action (getActions) at
+    each round, all in one array; at each episode they choose their strategies from their values, config.games games
+    are played with the same rules as the evolutionary dynamics (engine.simulateGeneration), and every value is updated
+    at once with the mean payoff of the learner
+    :param config: the SimulationConfig, with dynamics 'qLearning' or 'rothErev'
+    :param episodes: the amount of batches of games
+    :param rng: the np.random.Generator of the experience
+    :param common: if given, (seed, replica) of the common random numbers used instead of rng, see engine.commonStreams
+    :return: the contribution of each class at each round averaged over the episodes; size (classes, rho)
+    """
+    sizes, wealth, alphas = engine.getClasses(config)
+    classOf = np.repeat(np.arange(len(sizes)), sizes)
+    rngs = dict.fromkeys(engine.PURPOSES, rng) if common is None else engine.commonStreams(*common, 0)
+    wealthOf = engine.initWealth(config, classOf, wealth, rngs['init'])
+    individualWealth = None if config.wealthSpread == 0 or config.wealthDistribution == 'constant' else wealthOf
+    actions = getActions(config.actionLevels)
+    initial = 0.0 if config.dynamics == 'qLearning' else 1.0
+    values = np.full((len(classOf), config.rho, len(actions)), initial)
+    played = np.zeros(len(classOf))
+    contributionTotal = np.zeros((len(sizes), config.rho))
+    for i in range(episodes):  # choosing is timed as the selection stage and learning as the mutation stage
+        if common is not None:
+            rngs = engine.commonStreams(*common, i)
+        start = time.perf_counter()
+        chosen = choose(policy(values, config), rngs['selection'])
+        strategies = actions[chosen]
+        strategies[:, :, 1:] *= wealthOf[:, None, None]
+        if stats:
+            stats.lap('selection', start)
+        fitness, contribution = engine.simulateGeneration(config, strategies, classOf, wealth, alphas, individualWealth,
+                                                          rngs, stats, played)
+        contributionTotal += contribution
+
+        start = time.perf_counter()
+        update(values, chosen, np.where(played > 0, np.log(fitness), np.nan), config)
+        if stats:
+            stats.lap('mutation', start)
+            stats.count('generations')
+        if progress:
+            progress(i + 1, config.games)
+    return contributionTotal / episodes
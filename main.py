@@ -1,6 +1,5 @@
 import enum
 import numpy as np
-import plot
 
 class RiskRoundType(enum.Enum):
    EveryRound = 0
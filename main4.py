@@ -1,12 +1,22 @@
+import dataclasses
 import enum
+import time
 import numpy as np
+from store import ResultStore
 #import plot
 
+stats = None  # profiling.Stats accumulating the time of each stage and the counters, if instrumented
+progress = None  # called with the amount of generations done and the games per generation, instead of printing
+
+
 class RiskRoundType(enum.Enum):
    EveryRound = 0
    FirstRound = 1
    LastRound = 2
    RandomRound = 3
+   LastRounds = 4  # the last riskRoundCount rounds
+   BernoulliRounds = 5  # every round independently, with probability riskRoundProbability
+   GeometricHorizon = 6  # one round, geometric from the first one with parameter riskRoundProbability (capped at the last)
 
 
 def initWealth(amountOfIndividuals, wealth):
@@ -35,32 +45,32 @@ def initStrategies(amountOfIndividuals, wealth):
     return strategies
 
 
-def getPCR1(contribution, l1, l2, initialWealthTotal):
+def getPCR1(contribution, l1, initialWealthTotal):
     """
-    returns the loss probability at round r
-    :param contribution: C_r, the total contribution at round r
+    returns the loss probability at round r, decreasing linearly with the contribution
+    :param contribution: C_r, the total contribution at round r (number or np-array)
     :param l1: value of λ_1
     :param initialWealthTotal: sum of initial wealth of the individuals
     :return: loss probability at round r
     """
-    return (1 - (contribution / initialWealthTotal) * l1, 1 - (contribution / initialWealthTotal) * l2)
+    return np.clip(1 - (contribution / initialWealthTotal) * l1, 0, 1)
 
 
-def getPCR2(contribution, l1, l2, initialWealthTotal):
+def getPCR2(contribution, l2, initialWealthTotal):
     """
-    returns the loss probability at round r
-    :param contribution: C_r, the total contribution at round r
+    returns the loss probability at round r, decreasing as a power of the contribution
+    :param contribution: C_r, the total contribution at round r (number or np-array)
     :param l2: value of λ_2
     :param initialWealthTotal: sum of initial wealth of the individuals
     :return: loss probability at round r
     """
-    return (1 - (contribution / initialWealthTotal) ** l1, 1 - (contribution / initialWealthTotal) ** l2)
+    return np.clip(1 - np.clip(contribution / initialWealthTotal, 0, None) ** l2, 0, 1)
 
 
 def getPCR3(contribution, l1, initialWealthTotal):
     """
     returns the loss probability at round r
-    :param contribution: C_r, the total contribution at round r
+    :param contribution: C_r, the total contribution at round r (number or np-array)
     :param l3: value of λ_3
     :param initialWealthTotal: sum of initial wealth of the individuals
     :return: loss probability at round r
@@ -68,6 +78,9 @@ def getPCR3(contribution, l1, initialWealthTotal):
     return (1+(np.exp(l1*((contribution/initialWealthTotal)-1/2))))**(-1)
 
 
+RISK_CURVES = {1: getPCR1, 2: getPCR2, 3: getPCR3}
+
+
 def getParticipation(commonWealth, tau, a, b):
     """
     returns the participation of a player assuming that tau defines the commonWealth threshold under
@@ -111,21 +124,25 @@ def simulateGeneration(wealthR, wealthP, strategiesR, strategiesP, games, genera
     contributionR, contributionP = np.zeros(rho), np.zeros(rho) # the contribution rich (and poor) players give at each round
     payoffsR, payoffsP = np.zeros(numberOfRichs), np.zeros(numberOfPoors)  # the payoff earned by each player
     frequencyR, frequencyP = np.zeros(numberOfRichs), np.zeros(numberOfPoors)
-    for _ in range(games):
+    start = time.perf_counter()
+    riskRounds = getRiskRounds(riskRoundType, games, rho, np.random, riskRoundCount, riskRoundProbability)
+    for game in range(games):
         playerA, playerB = np.random.choice(numberOfRichs + numberOfPoors, size=2, replace=False)
         stateA = 'R' if playerA < numberOfRichs else 'P'
         stateB = 'R' if playerB < numberOfRichs else 'P'
+        if stats:
+            start = stats.lap('pairing', start)
         if stateA == 'P':
             playerA -= numberOfRichs
             if stateB == 'P':
                 playerB -= numberOfRichs
-                payoffA, payoffB, contributionA, contributionB = play(wealthP[playerA], strategiesP[playerA], wealthP[playerB], strategiesP[playerB], alphaP, alphaP)
+                payoffA, payoffB, contributionA, contributionB = play(wealthP[playerA], strategiesP[playerA], wealthP[playerB], strategiesP[playerB], alphaP, alphaP, riskRounds[game])
                 payoffsP[playerB] += payoffB
                 frequencyP[playerB] += 1
                 contributionP += contributionB
                 takenP += 1
             else:
-                payoffA, payoffB, contributionA, contributionB = play(wealthP[playerA], strategiesP[playerA], wealthR[playerB], strategiesR[playerB], alphaP, alphaR)
+                payoffA, payoffB, contributionA, contributionB = play(wealthP[playerA], strategiesP[playerA], wealthR[playerB], strategiesR[playerB], alphaP, alphaR, riskRounds[game])
                 payoffsR[playerB] += payoffB
                 frequencyR[playerB] += 1
                 contributionR += contributionB
@@ -137,13 +154,13 @@ def simulateGeneration(wealthR, wealthP, strategiesR, strategiesP, games, genera
         else:
             if stateB == 'P':
                 playerB -= numberOfRichs
-                payoffA, payoffB, contributionA, contributionB  = play(wealthR[playerA], strategiesR[playerA], wealthP[playerB], strategiesP[playerB], alphaR, alphaP)
+                payoffA, payoffB, contributionA, contributionB  = play(wealthR[playerA], strategiesR[playerA], wealthP[playerB], strategiesP[playerB], alphaR, alphaP, riskRounds[game])
                 payoffsP[playerB] += payoffB
                 frequencyP[playerB] += 1
                 contributionP += contributionB
                 takenP += 1
             else:
-                payoffA, payoffB, contributionA, contributionB  = play(wealthR[playerA], strategiesR[playerA], wealthR[playerB], strategiesR[playerB], alphaR, alphaR)
+                payoffA, payoffB, contributionA, contributionB  = play(wealthR[playerA], strategiesR[playerA], wealthR[playerB], strategiesR[playerB], alphaR, alphaR, riskRounds[game])
                 payoffsR[playerB] += payoffB
                 frequencyR[playerB] += 1
                 contributionR += contributionB
@@ -152,6 +169,8 @@ def simulateGeneration(wealthR, wealthP, strategiesR, strategiesP, games, genera
             frequencyR[playerA] += 1
             contributionR += contributionA
             takenR += 1
+        if stats:
+            start = stats.lap('play', start)
 
     fitnessR = np.zeros(numberOfRichs)
     fitnessP = np.zeros(numberOfPoors)
@@ -159,30 +178,48 @@ def simulateGeneration(wealthR, wealthP, strategiesR, strategiesP, games, genera
         fitnessR[player] = np.exp(payoffsR[player] / max(frequencyR[player], 1))
     for player in range(numberOfPoors):
         fitnessP[player] = np.exp(payoffsP[player] / max(frequencyP[player], 1))
+    if stats:
+        stats.lap('fitness', start)
+        stats.count('games', games)
     return fitnessR, fitnessP, contributionR/max(takenR, 1), contributionP/max(takenP, 1)
 
 
-def checkRiskRoundType(round, rho, randomRound):
-    riskPossible = False
+def getRiskRounds(riskRoundType, games, rho, rng=np.random, count=1, probability=0.5):
+    """
+    returns the rounds at which a loss can happen in each game, drawn at once for all the games of a generation
+    :param riskRoundType: the RiskRoundType
+    :param rng: np.random or a np.random.Generator
+    :param count: the amount of risky rounds of LastRounds
+    :param probability: the parameter of BernoulliRounds and GeometricHorizon
+    :return: boolean mask; size (games, rho)
+    """
+    mask = np.zeros((games, rho), dtype=bool)
     if riskRoundType == RiskRoundType.EveryRound:
-        riskPossible = True
-    elif riskRoundType == RiskRoundType.FirstRound and round == 0:
-        riskPossible = True
-    elif riskRoundType == RiskRoundType.LastRound and round == rho-1:
-        riskPossible = True
-    elif riskRoundType == RiskRoundType.RandomRound and round == randomRound:
-        riskPossible = True
-    return riskPossible
-
-
-def checkLossEvent(commonWealth, lambdaA, initialWealth, rounds, rho, randomRound):
+        mask[:] = True
+    elif riskRoundType == RiskRoundType.FirstRound:
+        mask[:, 0] = True
+    elif riskRoundType == RiskRoundType.LastRound:
+        mask[:, rho - 1] = True
+    elif riskRoundType == RiskRoundType.RandomRound:
+        mask[np.arange(games), (rng.random(games) * rho).astype(int)] = True
+    elif riskRoundType == RiskRoundType.LastRounds:
+        mask[:, max(rho - count, 0):] = True
+    elif riskRoundType == RiskRoundType.BernoulliRounds:
+        mask[:] = rng.random((games, rho)) < probability
+    elif riskRoundType == RiskRoundType.GeometricHorizon:
+        mask[np.arange(games), np.minimum(rng.geometric(probability, games) - 1, rho - 1)] = True
+    return mask
+
+
+def checkLossEvent(commonWealth, lambdaA, initialWealth, riskPossible):
     """
     Check if a loss event happens in this round
+    :param riskPossible: whether a loss can happen at this round, see getRiskRounds
     :return: True is a loss event happens, false otherwise.
     """
     lossEvent = False
-    if checkRiskRoundType(rounds, rho, randomRound):
-        probabilityOfLoss = getPCR3(commonWealth, lambdaA, initialWealth)
+    if riskPossible:
+        probabilityOfLoss = RISK_CURVES[riskCurve](commonWealth, lambdaA, initialWealth)
         if np.random.random() <= probabilityOfLoss:
             lossEvent = True
     else:
@@ -190,14 +227,13 @@ def checkLossEvent(commonWealth, lambdaA, initialWealth, rounds, rho, randomRoun
     return lossEvent, probabilityOfLoss
 
 
-def play(wealthA, strategyA, wealthB, strategyB, alphaA, alphaB):
+def play(wealthA, strategyA, wealthB, strategyB, alphaA, alphaB, riskRounds):
     contributionA, contributionB = np.zeros(rho), np.zeros(rho)
     commonWealth = 0
     totalGifts = np.zeros(2)
     originalWealth = np.array([wealthA, wealthB])
     alphaA = alphaR if wealthA == wealthR else alphaP
     alphaB = alphaR if wealthB == wealthR else alphaP
-    randomRound = np.random.randint(0, rho)
     riskAverage = 0
     payoffA = wealthA#np.sum(originalWealth)
     payoffB = wealthB#np.sum(originalWealth)
@@ -213,10 +249,12 @@ def play(wealthA, strategyA, wealthB, strategyB, alphaA, alphaB):
             totalGifts[1] += gifts[1]
             commonWealth += gifts[1]
             wealthB -= gifts[1]
-        lossEventA, p = checkLossEvent(commonWealth, lambdaA, np.sum(originalWealth), r, rho, randomRound)
+        lossEventA, p = checkLossEvent(commonWealth, lambdaA, np.sum(originalWealth), riskRounds[r])
         if lossEventA:
             wealthA -= alphaA * wealthA
             wealthB -= alphaB * wealthB
+            if stats:
+                stats.count('lossEvents')
         payoffA = (1 - alphaA*p)*(payoffA - gifts[0])
         payoffB = (1 - alphaB*p)*(payoffB - gifts[1])
     return payoffA, payoffB, contributionA, contributionB
@@ -233,22 +271,29 @@ def getDistribution(fitness):
     return distribution
 
 
-def experience(generations):
+def experience(generations, histogram=None):
+    """
+    :param histogram: if given, sketches.StrategyHistogram where the strategies played at each generation are added
+    """
     contributionRTotal = np.zeros(rho)
     contributionPTotal = np.zeros(rho)
     strategiesR = initStrategies(numberOfRichs, wealthR)
     strategiesP = initStrategies(numberOfPoors, wealthP)
     for i in range(generations):
-        if i%50 == 0:  
+        if progress is None and i%50 == 0:
             print("Generation", i)
         initialWealthR = initWealth(numberOfRichs, wealthR)
         initialWealthP = initWealth(numberOfPoors, wealthP)
         fitnessR, fitnessP, contributionR, contributionP = simulateGeneration(initialWealthR, initialWealthP, strategiesR, strategiesP, games, i)
+        if histogram is not None:
+            histogram.update(np.concatenate([strategiesR, strategiesP]), np.repeat([0, 1], [numberOfRichs, numberOfPoors]),
+                             np.repeat([wealthR, wealthP], [numberOfRichs, numberOfPoors]))
         distributionR = getDistribution(fitnessR)
         distributionP = getDistribution(fitnessP)
         contributionRTotal += contributionR
         contributionPTotal += contributionP
 
+        start = time.perf_counter()
         indexStrategiesR = np.random.choice(numberOfRichs, size=numberOfRichs, p=distributionR)
         newStrategiesR = [0 for _ in range(numberOfRichs)]
         for j in range(numberOfRichs):
@@ -260,22 +305,38 @@ def experience(generations):
         for j in range(numberOfPoors):
             newStrategiesP[j] = strategiesP[indexStrategiesP[j]]
         strategiesP = np.array(newStrategiesP)
+        if stats:
+            start = stats.lap('selection', start)
+
+        mutations = 0
         for strategy in range(numberOfRichs):
             for r in range(rho):
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesR[strategy][r][0] += np.random.normal(0, sigma)
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesR[strategy][r][1] = np.random.random()*wealthR
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesR[strategy][r][2] = np.random.random()*wealthR
         for strategy in range(numberOfPoors):
             for r in range(rho):
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesP[strategy][r][0] += np.random.normal(0, sigma)
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesP[strategy][r][1] = np.random.random()*wealthP
                 if np.random.random() <= mu:
+                    mutations += 1
                     strategiesP[strategy][r][2] = np.random.random()*wealthP
+        if stats:
+            stats.lap('mutation', start)
+            stats.count('mutations', mutations)
+            stats.count('generations')
+        if progress:
+            progress(i + 1, games)
     return contributionRTotal/generations, contributionPTotal/generations
 
 
@@ -284,20 +345,109 @@ def averageExperiences(experiments, generations):
     performs the experience experiments times
     :param experiments: the number of times to do the experiments
     :param generations: the number of generations to do
+    :return: the contributions of richs and poors at each round of each experiment; size (experiments, rho)
     """
-    contributionR = np.zeros(rho)
-    contributionP = np.zeros(rho)
+    contributionR = np.zeros((experiments, rho))
+    contributionP = np.zeros((experiments, rho))
     for experiment in range(experiments):
         print("Experiment", experiment)
-        payoff = experience(generations)
-        contributionR += payoff[0]
-        contributionP += payoff[1]
-#######################################STOCKER CEUX CI##############################################
+        contributionR[experiment], contributionP[experiment] = experience(generations)
     print("Contribution of richs at each round")
-    print(contributionR / experiments)
+    print(contributionR.mean(axis=0))
     print("Contribution of poors at each round")
-    print(contributionP / experiments)
-####################################################################################################
+    print(contributionP.mean(axis=0))
+    return contributionR, contributionP
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationConfig:
+    """
+    parameters of a simulation, applied to the module with applyConfig
+    """
+    numberOfRichs: int = 20
+    numberOfPoors: int = 20
+    rho: int = 4  # rounds
+    mu: float = 0.03  # probability of mutation
+    sigma: float = 0.15  # noise added to tau if mutating
+    lambdaA: float = 10
+    wealthR: float = 4
+    wealthP: float = 1
+    alphaR: float = 1.0
+    alphaP: float = 1.0
+    games: int = 1000
+    riskRoundType: RiskRoundType = RiskRoundType.EveryRound
+    riskCurve: int = 3  # getPCR1, getPCR2 or getPCR3
+    riskRoundCount: int = 1  # risky rounds of RiskRoundType.LastRounds
+    riskRoundProbability: float = 0.5  # parameter of RiskRoundType.BernoulliRounds and GeometricHorizon
+    # the fields below are only used by the batched engine (engine.py)
+    wealthClasses: tuple = ()  # ((size, wealth, alpha), ...) from the richest class, replaces the richs and the poors
+    wealthDistribution: str = 'constant'  # wealth of each individual around the wealth of its class: 'normal', 'lognormal'
+    wealthSpread: float = 0.0  # relative standard deviation of the wealth inside a class
+    groupSize: int = 2  # players of each game
+    pairing: str = 'random'  # 'random' (games random pairs) or 'roundRobin' (every pair once, expected payoffs)
+    dynamics: str = 'evolution'  # 'evolution' (selection and mutation), 'qLearning' or 'rothErev' (learning.py)
+    learningRate: float = 0.1  # step of the Q-learning updates, forgetting rate of Roth-Erev
+    exploration: float = 0.05  # probability of a random action of the Q-learners
+    actionLevels: int = 5  # values of tau, a and b the learners choose from, at each round
+    graph: str = ''  # '' (everyone can meet everyone), 'lattice', 'smallWorld' or 'scaleFree' (graphs.py)
+    graphDegree: int = 4  # mean degree of the smallWorld and scaleFree graphs
+    graphRewiring: float = 0.1  # probability of rewiring an edge of the smallWorld graph
+
+    def parameters(self):
+        """
+        returns the parameters as a dictionary that can be saved in json (in the result store); the optional fields left
+        to their default are omitted, so that adding one does not change the keys of the points already stored
+        """
+        parameters = dataclasses.asdict(self)
+        for name, default in OPTIONAL_PARAMETERS.items():
+            if parameters[name] == default:
+                del parameters[name]
+        parameters['riskRoundType'] = self.riskRoundType.name
+        parameters['alphaR'], parameters['alphaP'] = float(self.alphaR), float(self.alphaP)
+        return parameters
+
+    @classmethod
+    def fromParameters(cls, parameters):
+        """
+        returns the SimulationConfig of a dictionary of parameters (as given by parameters, or read from json); the
+        entries that are not fields (experiments, generations, ...) are ignored
+        """
+        fields = {field.name for field in dataclasses.fields(cls)}
+        values = {name: value for name, value in parameters.items() if name in fields}
+        if isinstance(values.get('riskRoundType'), str):
+            values['riskRoundType'] = RiskRoundType[values['riskRoundType']]
+        if 'wealthClasses' in values:
+            values['wealthClasses'] = tuple(tuple(wealthClass) for wealthClass in values['wealthClasses'])
+        return cls(**values)
+
+
+OPTIONAL_PARAMETERS = {'riskRoundCount': 1, 'riskRoundProbability': 0.5, 'wealthClasses': (),
+                       'wealthDistribution': 'constant', 'wealthSpread': 0.0, 'groupSize': 2, 'pairing': 'random',
+                       'dynamics': 'evolution', 'learningRate': 0.1, 'exploration': 0.05, 'actionLevels': 5,
+                       'graph': '', 'graphDegree': 4, 'graphRewiring': 0.1}
+
+
+def applyConfig(config):
+    """
+    sets the module-level parameters used by experience
+    """
+    globals().update((field.name, getattr(config, field.name)) for field in dataclasses.fields(config))
+
+
+def currentConfig():
+    """
+    returns the module-level parameters as a SimulationConfig
+    """
+    return SimulationConfig(**{field.name: globals()[field.name] for field in dataclasses.fields(SimulationConfig) if field.name in globals()})
+
+
+def currentParameters(experiments, generations):
+    """
+    returns the parameters of the current simulation, as saved in the result store
+    """
+    return dict(currentConfig().parameters(), experiments=experiments, generations=generations)
+
+
 if __name__ == '__main__':
     numberOfRichs = 20
     numberOfPoors = 20
@@ -312,17 +462,21 @@ if __name__ == '__main__':
     games = 1000  # ((numberOfRichs + numberOfPoors) ** 2) * 3
 
     riskRoundType = RiskRoundType(3)
+    riskRoundCount = 1
+    riskRoundProbability = 0.5
+    riskCurve = 3
+    store = ResultStore('results')
 
     alphaP = 1
     for i in range(1, 11, 1):
         alphaR = i/10
         print("ALPHA P =", alphaP, "| ALPHA R =", alphaR)
-        averageExperiences(experiments, generations)
+        store.save(currentParameters(experiments, generations), *averageExperiences(experiments, generations), source='main4.py')
         print()
 
     alphaP = 0.5
     for i in range(1, 11, 1):
         alphaR = i/10
         print("ALPHA P =", alphaP, "| ALPHA R =", alphaR)
-        averageExperiences(experiments, generations)
-        print()
\ No newline at end of file
+        store.save(currentParameters(experiments, generations), *averageExperiences(experiments, generations), source='main4.py')
+        print()
@@ -1,16 +1,78 @@
-import matplotlib.pyplot as plt
+import importlib
+import os
+import sys
 import numpy as np
 
+FORMATS = ('png',)
+headless = False
+figures = {}  # figures kept open and reused by name
 
-def effectOfFractionLossOnContributions(riskCurves, omegaIsOne, omegaIsTwo, omegaIsFour):
+
+def pyplot():
+    """
+    returns matplotlib.pyplot, imported at the first figure only so that the simulation modules and the sweep workers
+    never load matplotlib
+    """
+    if headless and 'matplotlib.pyplot' not in sys.modules:
+        importlib.import_module('matplotlib').use('Agg')
+    return importlib.import_module('matplotlib.pyplot')
+
+
+def useHeadless():
+    """
+    switches to the Agg backend: nothing is shown and nothing blocks, the figures can only be saved
+    """
+    global headless
+    headless = True
+    if 'matplotlib.pyplot' in sys.modules:
+        pyplot().switch_backend('Agg')
+
+
+def newFigure(name, rows, columns, figsize):
+    """
+    returns an empty figure and its axes, reusing the figure of the same name if it is still open
+    :param name: name of the figure
+    :return: the figure and its axes (a single axis if rows = columns = 1)
+    """
+    fig = figures.get(name)
+    plt = pyplot()
+    if fig is None or not plt.fignum_exists(fig.number):
+        fig = plt.figure(figsize=figsize)
+        figures[name] = fig
+    else:
+        fig.clear()
+        fig.set_size_inches(figsize)
+    return fig, fig.subplots(rows, columns)
+
+
+def showFigure(show):
+    if show and not headless:
+        pyplot().show()
+
+
+def saveFigure(fig, name, directory='.', formats=FORMATS):
+    """
+    writes the figure in every given format (png, svg, pdf, ...)
+    :return: the written paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, name + '.' + extension) for extension in formats]
+    for path in paths:
+        fig.savefig(path)
+    return paths
+
+
+def effectOfFractionLossOnContributions(riskCurves, omegaIsOne, omegaIsTwo, omegaIsFour, show=True):
     """
     plots the effect of fraction loss on contributions for 3 differents simulations
     :param riskCurves: array of risk curves; size 3
     :param omegaIsOne: array of simulations with omega = 1; size (3, 11)
     :param omegaIsTwo: array of simulations with omega = 2; size (3, 11)
     :param omegaIsFour: array of simulations with omega = 4; size (3, 11)
+    :param show: shows the figure
+    :return: the figure
     """
-    fig, axs = plt.subplots(2, 2, figsize=(6, 4))
+    fig, axs = newFigure('fig2', 2, 2, (6, 4))
 
     x_axis = np.arange(0, 11) * 0.1
     axs[0, 0].plot(x_axis, riskCurves[0], 'r-', x_axis, riskCurves[1], 'g-', x_axis, riskCurves[2], 'b-')
@@ -33,32 +95,40 @@ def effectOfFractionLossOnContributions(riskCurves, omegaIsOne, omegaIsTwo, omeg
             axs.flat[i].set(ylabel="Risk probability", xlabel=r"Contribution")
         else:
             axs.flat[i].set(ylabel="Contribution", xlabel=r"Loss fraction $\alpha$")
-    plt.show()
+    showFigure(show)
+    return fig
 
 
-def riskCurve():
-    steps = 10000
-    param = 10
+def riskCurve(steps=10000, param=10, show=True):
+    """
+    plots the risk probability with threshold effect, as a function of the contribution
+    :param steps: amount of points of the curve
+    :param param: value of λ_3
+    :param show: shows the figure
+    :return: the figure
+    """
+    fig, ax = newFigure('riskcurve', 1, 1, (6.4, 4.8))
 
-    x_axis = np.arange(0, 1, steps**(-1))
-    y_axis = np.zeros(steps)
-    for i in range(steps):
-        y_axis[i] = (1 + (np.exp(param * (x_axis[i] - 1 / 2)))) ** (-1)
+    x_axis = np.arange(steps) / steps
+    y_axis = (1 + np.exp(param * (x_axis - 1 / 2))) ** (-1)
 
-    plt.plot(x_axis, y_axis, 'g-')
-    plt.title(r"Risk curve with threshold effect")
-    plt.ylabel("Risk probability")
-    plt.xlabel("Contribution")
-    plt.show()
+    ax.plot(x_axis, y_axis, 'g-')
+    ax.set_title(r"Risk curve with threshold effect")
+    ax.set_ylabel("Risk probability")
+    ax.set_xlabel("Contribution")
+    showFigure(show)
+    return fig
 
 
-def variationOfLossEndowmentForRichAndPoorPlayer(contributionRich, contributionPoor):
+def variationOfLossEndowmentForRichAndPoorPlayer(contributionRich, contributionPoor, show=True):
     """
     plots the loss endowment for rich and poor players, x_p is constant
     :param contributionRich: array of array of the rich's contributions depending of x_r [every round, first round, last round, random round]; size(8,10)
     :param contributionPoor: array of array of the poor's contributions depending of x_r [every round, first round, last round, random round]; size(8,10)
+    :param show: shows the figure
+    :return: the figure
     """
-    fig, axs = plt.subplots(2, 4, figsize=(10, 4))
+    fig, axs = newFigure('fig3', 2, 4, (10, 4))
 
     x_axis = np.arange(1, 11) * 0.1
     for column in range(4):
@@ -81,16 +151,19 @@ def variationOfLossEndowmentForRichAndPoorPlayer(contributionRich, contributionP
     for ax in axs.flat:
         ax.set(ylabel="Contribution/wealth", xlabel=r"Loss fraction $\alpha_{R}$")
         ax.label_outer()
-    plt.show()
+    showFigure(show)
+    return fig
 
 
-def contributionsForDifferentTimingsOfPotentialLosses(contributionRich, contributionPoor):
+def contributionsForDifferentTimingsOfPotentialLosses(contributionRich, contributionPoor, show=True):
     """
     plots the contributions for different timings of potential losses in a four round game
     :param contributionRich: array of array of the rich's contributions depending of x_r [every round, first round, last round, random round]
     :param contributionPoor: array of array of the poor's contributions depending of x_p [every round, first round, last round, random round]
+    :param show: shows the figure
+    :return: the figure
     """
-    fig, axs = plt.subplots(4, 4, figsize=(10, 8))
+    fig, axs = newFigure('fig4', 4, 4, (10, 8))
     x = np.linspace(1, 4, 4)
     width = 0.35
     for column in range(4):
@@ -120,4 +193,5 @@ def contributionsForDifferentTimingsOfPotentialLosses(contributionRich, contribu
         ax.set(ylabel="Contribution", xlabel=r"Round number")
         ax.label_outer()
 
-    plt.show()
\ No newline at end of file
+    showFigure(show)
+    return fig
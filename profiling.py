@@ -0,0 +1,133 @@
+import collections
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+
+STAGES = ('pairing', 'play', 'fitness', 'selection', 'mutation')
+COUNTERS = ('games', 'mutations', 'lossEvents', 'generations')
+
+
+class Stats:
+    """
+    time spent in each stage of a generation and counters of what happened, accumulated over a run
+    """
+
+    def __init__(self):
+        self.timers = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def lap(self, stage, start):
+        """
+        adds the time elapsed since start to the stage
+        :return: the current time, start of the next stage
+        """
+        now = time.perf_counter()
+        self.timers[stage] += now - start
+        return now
+
+    def count(self, counter, amount=1):
+        self.counters[counter] += int(amount)
+
+    def merge(self, other):
+        for stage, elapsed in other.timers.items():
+            self.timers[stage] = self.timers.get(stage, 0.0) + elapsed
+        for counter, amount in other.counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def asDict(self):
+        return {'timers': dict(self.timers), 'counters': dict(self.counters)}
+
+    def report(self):
+        """
+        returns a readable summary: seconds and share of each stage, then the counters
+        """
+        total = sum(self.timers.values()) or 1
+        lines = ['%-10s %9.3fs %5.1f%%' % (stage, elapsed, 100 * elapsed / total) for stage, elapsed in self.timers.items()]
+        lines += ['%-10s %10d' % (counter, amount) for counter, amount in self.counters.items()]
+        return '\n'.join(lines)
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.asDict(), file, indent=1)
+
+
+class SamplingProfiler:
+    """
+    samples the call stack of a thread at a fixed interval, much cheaper than cProfile for long runs
+    """
+
+    def __init__(self, interval=0.005, thread=None):
+        self.interval = interval
+        self.threadId = (thread or threading.current_thread()).ident
+        self.own = collections.Counter()  # samples where the function was running
+        self.total = collections.Counter()  # samples where the function was on the stack
+        self.samples = 0
+        self.running = threading.Event()
+        self.sampler = None
+
+    def start(self):
+        self.running.clear()
+        self.sampler = threading.Thread(target=self.loop, daemon=True)
+        self.sampler.start()
+
+    def loop(self):
+        while not self.running.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[self.location(frame)] += 1
+            seen = set()
+            while frame is not None:
+                location = self.location(frame)
+                if location not in seen:
+                    self.total[location] += 1
+                    seen.add(location)
+                frame = frame.f_back
+
+    def stop(self):
+        self.running.set()
+        self.sampler.join()
+
+    @staticmethod
+    def location(frame):
+        code = frame.f_code
+        return '%s:%d(%s)' % (code.co_filename, code.co_firstlineno, code.co_name)
+
+    def report(self, limit=30):
+        samples = max(self.samples, 1)
+        lines = ['%d samples every %.1f ms' % (self.samples, self.interval * 1000), '   own%  total%  function']
+        for location, own in self.own.most_common(limit):
+            lines.append('%6.1f  %6.1f  %s' % (100 * own / samples, 100 * self.total[location] / samples, location))
+        return '\n'.join(lines)
+
+
+def profileCall(function, mode, path):
+    """
+    calls function under a profiler and writes the report
+    :param function: the function to call, without arguments
+    :param mode: 'cprofile' (pstats file readable with `python -m pstats`) or 'sampling' (text report)
+    :param path: path of the report, without extension
+    :return: what function returned
+    """
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        result = profiler.runcall(function)
+        profiler.dump_stats(path + '.prof')
+        with open(path + '.txt', 'w') as file:
+            pstats.Stats(profiler, stream=file).sort_stats('cumulative').print_stats(30)
+    elif mode == 'sampling':
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            result = function()
+        finally:
+            profiler.stop()
+        with open(path + '.txt', 'w') as file:
+            file.write(profiler.report())
+    else:
+        raise ValueError("unknown profiling mode %r" % mode)
+    return result
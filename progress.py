@@ -0,0 +1,158 @@
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+
+class Heartbeat:
+    """
+    called by experience after each generation in a worker; sends the progress of the replica to the reporter, at most
+    once per interval so that the queue stays cheap
+    """
+
+    def __init__(self, events, point, replica, interval=1.0):
+        self.events = events
+        self.point = point
+        self.replica = replica
+        self.interval = interval
+        self.last = 0
+        self.pid = threading.get_native_id()  # the pid in a worker process, the thread in the thread backend
+        self.events.put(('start', self.pid, point, replica, 0, 0, time.time()))
+
+    def __call__(self, generation, games):
+        now = time.time()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.events.put(('generation', self.pid, self.point, self.replica, generation, games, now))
+
+    def done(self, generation, games):
+        self.events.put(('done', self.pid, self.point, self.replica, generation, games, time.time()))
+
+
+class ProgressReporter:
+    """
+    aggregates the heartbeats of every worker and replica of a sweep, estimates the remaining time of each point and of
+    the whole grid, and writes them in a json status file that can be polled
+    """
+
+    def __init__(self, events, points, experiments, generations, path='status.json', interval=10.0, stallAfter=300.0,
+                 slowFactor=5.0, stream=sys.stdout):
+        """
+        :param events: the queue where the workers put their heartbeats
+        :param points: names of the sweep points
+        :param experiments: the number of replicas of each point (or a list, one number per point)
+        :param generations: the number of generations of each replica
+        :param path: path of the status file
+        :param interval: seconds between two writes of the status file
+        :param stallAfter: seconds without heartbeat after which a running replica is reported as stalled
+        :param slowFactor: a point is reported as slow if a generation takes this many times the median of the points
+        """
+        self.events = events
+        self.points = points
+        self.experiments = experiments if isinstance(experiments, list) else [experiments] * len(points)
+        self.generations = generations
+        self.path = path
+        self.interval = interval
+        self.stallAfter = stallAfter
+        self.slowFactor = slowFactor
+        self.stream = stream
+        self.start = time.time()
+        self.replicas = {}  # (point, replica) -> {'pid', 'generation', 'gamesPerGeneration', 'start', 'last', 'done'}
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.stopping.set()
+        self.thread.join()
+        self.drain()
+        self.write()
+
+    def loop(self):
+        while not self.stopping.wait(self.interval):
+            self.drain()
+            status = self.write()
+            if self.stream is not None:
+                self.stream.write(self.summary(status) + '\n')
+                self.stream.flush()
+
+    def drain(self):
+        while True:
+            try:
+                kind, pid, point, replica, generation, games, now = self.events.get_nowait()
+            except queue.Empty:
+                return
+            state = self.replicas.setdefault((point, replica), {'start': now, 'generation': 0, 'gamesPerGeneration': 0, 'done': False})
+            state.update(pid=pid, last=now)
+            if kind != 'start':
+                state['generation'], state['gamesPerGeneration'] = generation, games
+            state['done'] = kind == 'done'
+
+    def status(self):
+        """
+        returns the status of the sweep as a dictionary
+        """
+        now = time.time()
+        elapsed = max(now - self.start, 1e-9)
+        total = sum(self.experiments) * self.generations
+        done = sum(state['generation'] for state in self.replicas.values())
+        games = sum(state['gamesPerGeneration'] * state['generation'] for state in self.replicas.values())
+        rate = done / elapsed
+
+        points = []
+        for point, name in enumerate(self.points):
+            states = [state for (index, _), state in self.replicas.items() if index == point]
+            generations = sum(state['generation'] for state in states)
+            running = [state for state in states if not state['done']]
+            busy = sum((now if not state['done'] else state['last']) - state['start'] for state in states)
+            points.append({'point': name,
+                           'replicasDone': sum(state['done'] for state in states),
+                           'replicasRunning': len(running),
+                           'generations': generations,
+                           'remainingGenerations': self.experiments[point] * self.generations - generations,
+                           'secondsPerGeneration': busy / generations if generations else None,
+                           'stalled': [state['pid'] for state in running if now - state['last'] > self.stallAfter]})
+        speeds = [point['secondsPerGeneration'] for point in points if point['secondsPerGeneration']]
+        median = statistics.median(speeds) if speeds else None
+        for point in points:
+            speed = point['secondsPerGeneration'] or median
+            point['slow'] = bool(median and point['secondsPerGeneration'] and point['secondsPerGeneration'] > self.slowFactor * median)
+            point['eta'] = point['remainingGenerations'] * speed / max(point['replicasRunning'], 1) if speed else None
+
+        return {'time': now,
+                'elapsed': elapsed,
+                'generations': done,
+                'totalGenerations': total,
+                'generationsPerSecond': rate,
+                'gamesPerSecond': games / elapsed,
+                'eta': (total - done) / rate if rate else None,
+                'workers': len({state['pid'] for state in self.replicas.values() if not state['done']}),
+                'stalled': [point['point'] for point in points if point['stalled']],
+                'slow': [point['point'] for point in points if point['slow']],
+                'points': points}
+
+    def write(self):
+        status = self.status()
+        if self.path is not None:
+            with open(self.path + '.tmp', 'w') as file:
+                json.dump(status, file, indent=1)
+            os.replace(self.path + '.tmp', self.path)
+        return status
+
+    @staticmethod
+    def summary(status):
+        eta = '?' if status['eta'] is None else '%.0fs' % status['eta']
+        line = '%d/%d generations | %.1f generations/s | %.0f games/s | %d workers | ETA %s' % (
+            status['generations'], status['totalGenerations'], status['generationsPerSecond'], status['gamesPerSecond'],
+            status['workers'], eta)
+        if status['stalled']:
+            line += ' | STALLED: %s' % ', '.join(map(str, status['stalled']))
+        if status['slow']:
+            line += ' | slow: %s' % ', '.join(map(str, status['slow']))
+        return line
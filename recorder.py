@@ -0,0 +1,127 @@
+import json
+import os
+import zlib
+import numpy as np
+
+PRECISIONS = ('float64', 'float32', 'float16', 'uint16', 'uint8')
+
+
+class StrategyRecorder:
+    """
+    writes the strategies of a population every `every` generations to disk: the recorded generations are gathered by
+    chunks of `chunk`, each chunk compressed with zlib and appended to path.bin, and the index of the chunks is written
+    to path.json when the recorder is closed. With the precisions uint16 and uint8, tau, a and b are quantized between
+    their minimum and maximum in the chunk. Only one chunk is kept in memory, see StrategyTrajectory to read it back
+    """
+
+    def __init__(self, path, individuals, rho, every=1, chunk=64, precision='float32', level=6):
+        if precision not in PRECISIONS:
+            raise ValueError("unknown precision %r, expected one of %s" % (precision, ', '.join(PRECISIONS)))
+        self.path = path
+        self.every = every
+        self.precision = precision
+        self.level = level
+        self.buffer = np.empty((chunk, individuals, rho, 3))
+        self.rows = 0  # recorded generations in the buffer
+        self.chunks = []
+        self.offset = 0
+        self.file = open(path + '.bin', 'wb')
+
+    def record(self, generation, strategies):
+        """
+        :param generation: the generation of the strategies, only the multiples of every are recorded
+        :param strategies: size (individuals, rho, 3)
+        """
+        if generation % self.every:
+            return
+        self.buffer[self.rows] = strategies
+        self.rows += 1
+        if self.rows == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.rows == 0:
+            return
+        values = self.buffer[:self.rows]
+        entry = {'rows': self.rows}
+        if self.precision.startswith('uint'):
+            low, high = values.min(axis=(0, 1, 2)), values.max(axis=(0, 1, 2))
+            scale = (high - low) / np.iinfo(self.precision).max
+            scale[scale == 0] = 1.0
+            values = np.rint((values - low) / scale)
+            entry.update(low=low.tolist(), scale=scale.tolist())
+        data = zlib.compress(np.ascontiguousarray(values, dtype=self.precision).tobytes(), self.level)
+        self.file.write(data)
+        entry.update(offset=self.offset, size=len(data))
+        self.chunks.append(entry)
+        self.offset += len(data)
+        self.rows = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        with open(self.path + '.json', 'w') as file:
+            json.dump({'shape': list(self.buffer.shape[1:]), 'chunk': len(self.buffer), 'every': self.every,
+                       'precision': self.precision, 'chunks': self.chunks}, file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class StrategyTrajectory:
+    """
+    reads a recording of StrategyRecorder, indexed like an array of size (recorded generations, individuals, rho, 3);
+    the file is memory-mapped and only the chunks holding the requested generations are decompressed, e.g.
+    trajectory[-1] is the last recorded population and trajectory[::10, :, 0, 0] the tau of the first round of every
+    individual every 10 recorded generations
+    """
+
+    def __init__(self, path):
+        with open(path + '.json') as file:
+            index = json.load(file)
+        self.shape = (sum(entry['rows'] for entry in index['chunks']),) + tuple(index['shape'])
+        self.chunk = index['chunk']
+        self.every = index['every']
+        self.precision = index['precision']
+        self.chunks = index['chunks']
+        self.data = np.memmap(path + '.bin', dtype=np.uint8, mode='r') if self.chunks else None
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def generations(self):
+        """
+        the generation of each recorded population
+        """
+        return np.arange(len(self)) * self.every
+
+    def readChunk(self, number):
+        entry = self.chunks[number]
+        data = zlib.decompress(self.data[entry['offset']:entry['offset'] + entry['size']])
+        values = np.frombuffer(data, dtype=self.precision).reshape((entry['rows'],) + self.shape[1:])
+        if 'low' in entry:
+            return values * np.array(entry['scale']) + np.array(entry['low'])
+        return values.astype(np.float64)
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        rows = np.arange(len(self))[key[0]]
+        wanted = np.atleast_1d(rows)
+        numbers = np.unique(wanted // self.chunk)
+        chunks = np.concatenate([self.readChunk(number) for number in numbers]) if len(numbers) else np.empty((0,) + self.shape[1:])
+        position = np.searchsorted(numbers, wanted // self.chunk) * self.chunk + wanted % self.chunk
+        values = chunks[position] if np.ndim(rows) else chunks[position[0]]
+        return values[(slice(None),) * np.ndim(rows) + key[1:]]
+
+
+def recordingPath(directory, key, replica):
+    """
+    returns the path (without extension) of the recording of a replica of a sweep point
+    """
+    return os.path.join(directory, '%s-%d' % (key, replica))
@@ -0,0 +1,168 @@
+import argparse
+import dataclasses
+import numpy as np
+import main4
+import sweep
+from store import ResultStore, pointKey
+
+# the factors of the analysis and their ranges; riskTiming is categorical, one of sweep.TIMINGS
+FACTORS = {'alphaR': (0.0, 1.0),
+           'alphaP': (0.0, 1.0),
+           'lambdaA': (1.0, 20.0),
+           'mu': (0.005, 0.1),
+           'sigma': (0.05, 0.3),
+           'wealthRatio': (1.0, 8.0),  # wealthR / wealthP, wealthP being kept
+           'riskTiming': (0.0, 1.0)}
+OUTPUTS = ('richs', 'poors')
+
+
+def getConfig(unit, base=main4.SimulationConfig(), factors=tuple(FACTORS)):
+    """
+    returns the SimulationConfig of a point of the unit hypercube
+    :param unit: one value in [0, 1] per factor
+    """
+    values = {factor: FACTORS[factor][0] + u * (FACTORS[factor][1] - FACTORS[factor][0]) for factor, u in zip(factors, unit)}
+    changes = {factor: value for factor, value in values.items() if factor in ('alphaR', 'alphaP', 'lambdaA', 'mu', 'sigma')}
+    if 'wealthRatio' in values:
+        changes['wealthR'] = values['wealthRatio'] * base.wealthP
+    if 'riskTiming' in values:
+        timing = sweep.TIMINGS[min(int(values['riskTiming'] * len(sweep.TIMINGS)), len(sweep.TIMINGS) - 1)]
+        changes['riskRoundType'] = main4.RiskRoundType[timing]
+    return dataclasses.replace(base, **changes)
+
+
+def evaluate(units, experiments, generations, base=main4.SimulationConfig(), factors=tuple(FACTORS), **options):
+    """
+    runs the points of a design with sweep.runSweep (batched engine, common random numbers), each distinct point once
+    :param units: the points in the unit hypercube; size (points, factors)
+    :param options: other arguments of runSweep (processes, store, seed, backend...)
+    :return: the total contribution over the rounds of the richs and of the poors at each point, averaged over the
+        replicas; size (points, 2)
+    """
+    configs = [getConfig(unit, base, factors) for unit in units]
+    keys = [pointKey(config.parameters()) for config in configs]
+    distinct = sorted(set(keys))
+    index = {key: i for i, key in enumerate(distinct)}
+    byKey = {key: config for key, config in zip(keys, configs)}
+    options = dict({'engineName': 'batched', 'common': True}, **options)
+    contributionR, contributionP = sweep.runSweep([byKey[key] for key in distinct], experiments, generations, **options)
+    outputs = np.stack([np.nanmean(contributionR, axis=1).sum(axis=-1), np.nanmean(contributionP, axis=1).sum(axis=-1)], -1)
+    return outputs[[index[key] for key in keys]]
+
+
+def saltelliDesign(samples, factors, rng):
+    """
+    Saltelli design: two independent matrices A and B of random points (Latin hypercube samples), then for each factor
+    i the matrix AB_i, equal to A except for the column i taken from B
+    :return: the points in the order A, B, AB_1, ..., AB_k; size (samples * (factors + 2), factors)
+    """
+    def latinHypercube():
+        strata = np.argsort(rng.random((factors, samples)), axis=1).T
+        return (strata + rng.random((samples, factors))) / samples
+    a, b = latinHypercube(), latinHypercube()
+    mixed = np.repeat(a[None], factors, axis=0)
+    mixed[np.arange(factors), :, np.arange(factors)] = b.T
+    return np.concatenate([a, b, mixed.reshape(-1, factors)])
+
+
+def sobolIndices(outputs, samples, factors, rng, resamples=1000, level=0.95):
+    """
+    first-order (Saltelli 2010) and total (Jansen) Sobol indices of a Saltelli design, with bootstrap intervals: the
+    samples are resampled all at once for every factor and output
+    :param outputs: the outputs of the points of saltelliDesign; size (samples * (factors + 2), outputs)
+    :return: dictionary 'first' and 'total' -> (estimate, lower bound, upper bound), each of size (factors, outputs)
+    """
+    a, b = outputs[:samples], outputs[samples:2 * samples]
+    mixed = outputs[2 * samples:].reshape(factors, samples, -1)
+
+    def indices(rows):
+        fa, fb, fab = a[rows], b[rows], mixed[:, rows]
+        variance = np.var(np.concatenate([fa, fb], axis=-2), axis=-2)
+        variance = np.where(variance > 0, variance, np.nan)
+        first = np.mean(fb * (fab - fa), axis=-2) / variance
+        total = 0.5 * np.mean((fa - fab) ** 2, axis=-2) / variance
+        return first, total
+
+    estimates = indices(np.arange(samples))
+    boots = indices(rng.integers(0, samples, (resamples, samples)))  # each of size (factors, resamples, outputs)
+    return {name: (estimate, *np.quantile(boot, [(1 - level) / 2, (1 + level) / 2], axis=1))
+            for name, estimate, boot in zip(('first', 'total'), estimates, boots)}
+
+
+def morrisDesign(trajectories, factors, rng, levels=4):
+    """
+    Morris design: each trajectory starts from a random point of a grid of levels values per factor, then moves one
+    factor at a time, in a random order, by delta = levels / (2 (levels - 1))
+    :return: the points, trajectory after trajectory; size (trajectories * (factors + 1), factors), the factor moved at
+        each step and its move (+delta or -delta); each of size (trajectories, factors)
+    """
+    delta = levels / (2 * (levels - 1))
+    start = rng.integers(0, levels // 2, (trajectories, factors)) / (levels - 1)
+    up = rng.random((trajectories, factors)) < 0.5
+    start = np.where(up, start, start + delta)
+    order = np.argsort(rng.random((trajectories, factors)), axis=1)
+    steps = np.zeros((trajectories, factors + 1, factors))
+    moves = np.where(np.take_along_axis(up, order, 1), delta, -delta)
+    steps[np.arange(trajectories)[:, None], np.arange(1, factors + 1)[None, :], order] = moves
+    points = start[:, None, :] + np.cumsum(steps, axis=1)
+    return points.reshape(-1, factors), order, moves
+
+
+def morrisIndices(outputs, order, moves, rng, resamples=1000, level=0.95):
+    """
+    Morris elementary effects: mu* (mean absolute effect) and sigma (standard deviation of the effects) of each factor,
+    with bootstrap intervals of mu* over the trajectories
+    :param outputs: the outputs of the points of morrisDesign; size (trajectories * (factors + 1), outputs)
+    :return: dictionary 'muStar' -> (estimate, lower bound, upper bound) and 'sigma' -> estimate, each of size
+        (factors, outputs)
+    """
+    trajectories, factors = order.shape
+    outputs = outputs.reshape(trajectories, factors + 1, -1)
+    effects = np.empty((trajectories, factors, outputs.shape[-1]))
+    effects[np.arange(trajectories)[:, None], order] = np.diff(outputs, axis=1) / moves[..., None]
+    muStar = np.abs(effects).mean(axis=0)
+    rows = rng.integers(0, trajectories, (resamples, trajectories))
+    boot = np.abs(effects[rows]).mean(axis=1)
+    return {'muStar': (muStar, *np.quantile(boot, [(1 - level) / 2, (1 + level) / 2], axis=0)),
+            'sigma': effects.std(axis=0, ddof=1)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Global sensitivity of the contributions to the parameters of the model')
+    parser.add_argument('method', choices=['sobol', 'morris'])
+    parser.add_argument('--samples', type=int, default=64,
+                        help='sobol: base samples (samples * (factors + 2) points); morris: trajectories')
+    parser.add_argument('--experiments', type=int, default=3, help='replicas of each point')
+    parser.add_argument('--generations', type=int, default=1000, help='generations of each replica')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (all the cores by default)')
+    parser.add_argument('--threads', action='store_true', help='run the replicas on threads instead of processes')
+    parser.add_argument('--resamples', type=int, default=1000, help='bootstrap resamples of the intervals')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--results', default='results', help='directory of the result store')
+    arguments = parser.parse_args()
+
+    rng = np.random.default_rng(arguments.seed)
+    factors = len(FACTORS)
+    options = {'processes': arguments.processes, 'store': ResultStore(arguments.results), 'seed': arguments.seed,
+               'source': 'sensitivity.py', 'backend': 'threads' if arguments.threads else 'processes'}
+    if arguments.method == 'sobol':
+        units = saltelliDesign(arguments.samples, factors, rng)
+        print("Running %d points" % len(units))
+        result = sobolIndices(evaluate(units, arguments.experiments, arguments.generations, **options), arguments.samples,
+                              factors, rng, arguments.resamples)
+        for output, name in enumerate(OUTPUTS):
+            print("Contribution of the %s" % name)
+            for factor, factorName in enumerate(FACTORS):
+                print("  %-12s first %6.3f [%6.3f, %6.3f]  total %6.3f [%6.3f, %6.3f]" % (
+                    factorName, *(bound[factor, output] for bound in result['first']),
+                    *(bound[factor, output] for bound in result['total'])))
+    else:
+        units, order, moves = morrisDesign(arguments.samples, factors, rng)
+        print("Running %d points" % len(units))
+        result = morrisIndices(evaluate(units, arguments.experiments, arguments.generations, **options), order, moves, rng,
+                               arguments.resamples)
+        for output, name in enumerate(OUTPUTS):
+            print("Contribution of the %s" % name)
+            for factor, factorName in enumerate(FACTORS):
+                print("  %-12s mu* %6.3f [%6.3f, %6.3f]  sigma %6.3f" % (
+                    factorName, *(bound[factor, output] for bound in result['muStar']), result['sigma'][factor, output]))
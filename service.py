@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import queue
+import socket
+import threading
+import numpy as np
+import main4
+import sweep
+from store import ResultStore, pointKey
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+
+class Job:
+    """
+    the replicas of one sweep point, run on the pool of the service; every message is kept so that a client submitting
+    the same point later receives the whole history before the next messages
+    """
+
+    def __init__(self, number, key, config, experiments, generations, engineName, seed):
+        self.number = number
+        self.key = key
+        self.config = config
+        self.experiments = experiments
+        self.generations = generations
+        self.engineName = engineName
+        self.seed = seed
+        self.messages = []
+        self.subscribers = []  # asyncio.Queue of every connected client following the job
+        self.contributions = [None] * experiments
+        self.futures = []
+        self.done = False
+        self.failed = False
+
+    def publish(self, message):
+        message = dict(message, job=self.key)
+        self.messages.append(message)
+        for subscriber in self.subscribers:
+            subscriber.put_nowait(message)
+
+
+class JobService:
+    """
+    accepts sweep points from several clients (one json line per submission on a localhost socket), runs their replicas
+    on one shared process pool and streams back the progress of every replica, each replica when it is done and the
+    averaged result; identical submissions share the same job, and the points already in the store are answered at once
+    """
+
+    def __init__(self, processes=None, store=None):
+        self.store = store
+        # spawned workers: forked ones would inherit the sockets of the clients connected when they start
+        context = multiprocessing.get_context('spawn')
+        self.events = context.Queue()
+        self.pool = concurrent.futures.ProcessPoolExecutor(processes, context, sweep.initWorker, (self.events,))
+        self.jobs = {}
+        self.numbers = {}  # job number (the point index of the heartbeats) -> job
+        self.loop = None
+
+    async def serve(self, host=HOST, port=PORT):
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self.forwardHeartbeats, daemon=True).start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print("Listening on %s:%d" % (host, port))
+        async with server:
+            await server.serve_forever()
+
+    def forwardHeartbeats(self):
+        """
+        moves the heartbeats of the workers from their queue to the jobs, in the event loop
+        """
+        while True:
+            try:
+                kind, _, number, replica, generation, _, _ = self.events.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if kind == 'generation' and not self.numbers[number].failed:
+                self.loop.call_soon_threadsafe(self.numbers[number].publish,
+                                               {'event': 'progress', 'replica': replica, 'generation': generation})
+
+    def submit(self, request):
+        """
+        returns the job of a request, creating and scheduling it unless the same point is already known
+        :param request: {'config': parameters of a SimulationConfig, 'experiments', 'generations', 'engine', 'seed'}
+        """
+        config = main4.SimulationConfig.fromParameters(request['config'])
+        experiments, generations = request.get('experiments', 3), request.get('generations', 2000)
+        engineName, seed = request.get('engine', 'batched'), request.get('seed', 0)
+        parameters = dict(config.parameters(), experiments=experiments, generations=generations, engine=engineName)
+        key = pointKey(dict(parameters, seed=seed))
+        if key in self.jobs:
+            return self.jobs[key]
+        job = Job(len(self.numbers), key, config, experiments, generations, engineName, seed)
+        self.jobs[key] = job
+        self.numbers[job.number] = job
+        stored = pointKey(parameters)  # the exact point: a query would also match points with non-default optional fields
+        if self.store is not None and stored in self.store.index:
+            job.done = True
+            job.publish({'event': 'done', 'cached': True, 'contributionR': self.store.mean(stored, 'contributionR').tolist(),
+                         'contributionP': self.store.mean(stored, 'contributionP').tolist()})
+        else:
+            job.publish({'event': 'queued', 'parameters': parameters})
+            for replica in range(experiments):
+                task = (job.number, replica, config, generations, seed, None, engineName, False)
+                future = self.loop.run_in_executor(self.pool, sweep.runReplica, task)
+                future.add_done_callback(lambda future, job=job: self.replicaDone(job, future))
+                job.futures.append(future)
+        return job
+
+    def replicaDone(self, job, future):
+        """
+        keeps the result of a replica, and saves and publishes the point once all its replicas are done; the first error
+        fails the job: it is forgotten so that the point can be submitted again, and its other replicas are cancelled or,
+        if already running, ignored
+        """
+        if job.failed or future.cancelled():
+            return
+        if future.exception() is not None:
+            job.done = job.failed = True
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+            for other in job.futures:
+                other.cancel()
+            job.publish({'event': 'error', 'error': repr(future.exception())})
+            return
+        _, replica, contribution = future.result()
+        job.contributions[replica] = contribution
+        job.publish({'event': 'replica', 'replica': replica, 'contribution': contribution.tolist()})
+        if all(contribution is not None for contribution in job.contributions):
+            contributionR = [contribution[0] for contribution in job.contributions]
+            contributionP = [contribution[-1] for contribution in job.contributions]
+            if self.store is not None:
+                parameters = dict(job.config.parameters(), experiments=job.experiments, generations=job.generations,
+                                  engine=job.engineName)
+                self.store.save(parameters, contributionR, contributionP, source='service.py')
+            job.done = True
+            job.publish({'event': 'done', 'cached': False, 'contributionR': np.mean(contributionR, axis=0).tolist(),
+                         'contributionP': np.mean(contributionP, axis=0).tolist()})
+
+    async def handle(self, reader, writer):
+        """
+        serves one client: every line it sends is a submission, every line it receives a message of one of its jobs;
+        the connection is closed when all its jobs are done
+        """
+        subscriber = asyncio.Queue()
+        following = {}  # key -> job, a failed job being no longer in self.jobs
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                job = self.submit(json.loads(line))
+                if job.key not in following:
+                    following[job.key] = job
+                    for message in job.messages:
+                        subscriber.put_nowait(message)
+                    job.subscribers.append(subscriber)
+            while not all(job.done for job in following.values()) or not subscriber.empty():
+                message = await subscriber.get()
+                writer.write((json.dumps(message) + '\n').encode())
+                await writer.drain()
+        finally:
+            for job in following.values():
+                job.subscribers.remove(subscriber)
+            writer.close()
+
+
+def submit(requests, host=HOST, port=PORT):
+    """
+    sends sweep points to a running service and yields its messages as they arrive, until all the points are done
+    :param requests: list of {'config': parameters of a SimulationConfig, 'experiments', 'generations', 'engine', 'seed'}
+    """
+    with socket.create_connection((host, port)) as connection:
+        connection.sendall(b''.join((json.dumps(request) + '\n').encode() for request in requests) + b'\n')
+        with connection.makefile() as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local simulation service shared by several clients')
+    parser.add_argument('command', choices=['serve', 'submit'])
+    parser.add_argument('config', nargs='?', default='{}', help='submit: json parameters of the SimulationConfig')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--processes', type=int, default=None, help='serve: worker processes (all the cores by default)')
+    parser.add_argument('--results', default='results', help='serve: directory of the result store')
+    parser.add_argument('--experiments', type=int, default=3, help='submit: replicas of the point')
+    parser.add_argument('--generations', type=int, default=2000, help='submit: generations of each replica')
+    parser.add_argument('--engine', choices=['reference', 'batched'], default='batched', help='submit: simulation engine')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    if arguments.command == 'serve':
+        asyncio.run(JobService(arguments.processes, ResultStore(arguments.results)).serve(port=arguments.port))
+    else:
+        request = {'config': json.loads(arguments.config), 'experiments': arguments.experiments,
+                   'generations': arguments.generations, 'engine': arguments.engine, 'seed': arguments.seed}
+        for message in submit([request], port=arguments.port):
+            print(json.dumps(message))
@@ -0,0 +1,78 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedResults:
+    """
+    result buffers of a sweep in shared memory, indexed by (sweep point, replica): the workers write their results in
+    place and the parent reads them without any copy or pickling
+
+    - contributions: the contribution of each class at each round; size (points, experiments, classes, rho)
+    - trajectory (optional): the same at every generation; size (points, experiments, generations, classes, rho)
+    - payoffs (optional): the mean payoff of each class at every generation; size (points, experiments, generations,
+      classes)
+    - populations (optional): the final strategies; size (points, experiments, individuals, rho, 3)
+    - histograms and extremes (optional): the counts and the extremes of a sketches.StrategyHistogram; size (points,
+      experiments, classes, rho, 3, bins + 2) and (points, experiments, classes, rho, 3, 2)
+    """
+
+    def __init__(self, shapes, names=None):
+        """
+        creates the buffers (filled with nan), or attaches to the buffers of the parent if names is given
+        :param shapes: dictionary buffer name -> shape
+        :param names: dictionary buffer name -> name of its shared memory block
+        """
+        self.shapes = shapes
+        self.owner = names is None
+        self.blocks = {}
+        for buffer, shape in shapes.items():
+            size = max(int(np.prod(shape)) * 8, 1)
+            block = shared_memory.SharedMemory(create=True, size=size) if self.owner else shared_memory.SharedMemory(names[buffer])
+            self.blocks[buffer] = block
+            array = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+            if self.owner:
+                array[:] = np.nan
+            setattr(self, buffer, array)
+
+    @classmethod
+    def allocate(cls, points, experiments, classes, rho, generations=None, individuals=None, bins=None):
+        """
+        :param generations: if given, the trajectory and the payoffs of every generation are recorded
+        :param individuals: if given, the final population of every replica is kept
+        :param bins: if given, the histogram of the strategies of every replica is kept
+        """
+        shapes = {'contributions': (points, experiments, classes, rho)}
+        if generations:
+            shapes['trajectory'] = (points, experiments, generations, classes, rho)
+            shapes['payoffs'] = (points, experiments, generations, classes)
+        if individuals:
+            shapes['populations'] = (points, experiments, individuals, rho, 3)
+        if bins:
+            shapes['histograms'] = (points, experiments, classes, rho, 3, bins + 2)
+            shapes['extremes'] = (points, experiments, classes, rho, 3, 2)
+        return cls(shapes)
+
+    def spec(self):
+        """
+        returns what a worker needs to attach to the buffers, see attach
+        """
+        return self.shapes, {buffer: block.name for buffer, block in self.blocks.items()}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(*spec)
+
+    def close(self):
+        for buffer in self.shapes:
+            delattr(self, buffer)
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class StrategyHistogram:
+    """
+    streaming histogram of tau, a and b at each round in each class, over the individuals of every generation given to
+    update: the bins split [0, 1] (a and b as fractions of the wealth of the individual) into bins equal parts, plus an
+    underflow and an overflow bin, since tau drifts out of [0, 1] (tau < 0: always b, tau > 1: always a). The bins
+    being fixed, the histograms of several replicas or workers are merged by adding their counts; the extremes of every
+    parameter are kept as well, so that the quantiles can be estimated without the individual values
+    """
+
+    def __init__(self, classes, rho, bins=20):
+        self.bins = bins
+        self.counts = np.zeros((classes, rho, 3, bins + 2))  # underflow, bins, overflow
+        self.lowest = np.full((classes, rho, 3), np.inf)
+        self.highest = np.full((classes, rho, 3), -np.inf)
+
+    @classmethod
+    def fromReplicas(cls, counts, extremes):
+        """
+        merges the histograms of several replicas stored by a sweep (see sweep.runSweep)
+        :param counts: size (replicas, classes, rho, 3, bins + 2)
+        :param extremes: the lowest and highest values; size (replicas, classes, rho, 3, 2)
+        """
+        counts, extremes = np.asarray(counts), np.asarray(extremes)
+        histogram = cls(counts.shape[1], counts.shape[2], counts.shape[-1] - 2)
+        histogram.counts = counts.sum(axis=0)
+        histogram.lowest, histogram.highest = extremes[..., 0].min(axis=0), extremes[..., 1].max(axis=0)
+        return histogram
+
+    @property
+    def edges(self):
+        return np.linspace(0, 1, self.bins + 1)
+
+    def update(self, strategies, classOf, wealthOf):
+        """
+        adds every individual of a generation, all the cells at once
+        :param strategies: size (individuals, rho, 3)
+        :param classOf: the class of each individual
+        :param wealthOf: the wealth of each individual
+        """
+        rho = self.counts.shape[1]
+        values = strategies.copy()
+        values[:, :, 1:] /= wealthOf[:, None, None]
+        bins = np.clip(np.floor(values * self.bins).astype(np.int64) + 1, 0, self.bins + 1)
+        bins[values == 1] = self.bins  # the last bin is closed
+        cells = (classOf[:, None, None] * rho + np.arange(rho)[None, :, None]) * 3 + np.arange(3)
+        self.counts += np.bincount((cells * (self.bins + 2) + bins).ravel(),
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+        cells = np.broadcast_to(classOf[:, None, None], values.shape)
+        np.minimum.at(self.lowest, (cells, *np.indices(values.shape)[1:]), values)
+        np.maximum.at(self.highest, (cells, *np.indices(values.shape)[1:]), values)
+
+    def merge(self, other):
+        """
+        adds the counts of another histogram with the same bins, e.g. of another replica
+        """
+        if other.counts.shape != self.counts.shape:
+            raise ValueError("histograms of sizes %s and %s cannot be merged" % (self.counts.shape, other.counts.shape))
+        self.counts += other.counts
+        self.lowest = np.minimum(self.lowest, other.lowest)
+        self.highest = np.maximum(self.highest, other.highest)
+        return self
+
+    def density(self):
+        """
+        returns the fraction of the values in each bin of [0, 1], underflow and overflow excluded; size
+        (classes, rho, 3, bins)
+        """
+        total = self.counts.sum(axis=-1, keepdims=True)
+        return self.counts[..., 1:-1] / np.where(total > 0, total, 1)
+
+    def quantiles(self, levels):
+        """
+        estimates quantiles by linear interpolation in the bins, the underflow and overflow bins spanning from the
+        extremes to the edges of [0, 1]; the error is at most the width of a bin inside [0, 1], the quantiles outside
+        of it being rough
+        :param levels: the levels in [0, 1], e.g. (0.25, 0.5, 0.75)
+        :return: size (len(levels), classes, rho, 3), nan for the cells without values
+        """
+        edges = np.broadcast_to(self.edges, self.counts.shape[:-1] + (self.bins + 1,))
+        lower = np.concatenate([np.minimum(self.lowest, 0)[..., None], edges], axis=-1)
+        upper = np.concatenate([edges, np.maximum(self.highest, 1)[..., None]], axis=-1)
+        cumulated = np.cumsum(self.counts, axis=-1)
+        total = cumulated[..., -1:]
+        result = []
+        for level in np.atleast_1d(levels):
+            target = level * total
+            index = np.minimum((cumulated < target).sum(axis=-1, keepdims=True), self.bins + 1)
+            before = np.take_along_axis(cumulated, index, -1) - np.take_along_axis(self.counts, index, -1)
+            inBin = np.take_along_axis(self.counts, index, -1)
+            fraction = np.where(inBin > 0, (target - before) / np.where(inBin > 0, inBin, 1), 0)
+            low, high = np.take_along_axis(lower, index, -1), np.take_along_axis(upper, index, -1)
+            value = low + np.clip(fraction, 0, 1) * (high - low)
+            result.append(np.where(total > 0, value, np.nan)[..., 0])
+        return np.array(result)
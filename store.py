@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+
+INDEX = 'index.json'
+
+
+def pointKey(parameters):
+    """
+    returns the key of a sweep point, derived from its parameters only
+    :param parameters: dictionary of the parameters of the sweep point
+    :return: a short hexadecimal key
+    """
+    text = json.dumps(parameters, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def equal(stored, value):
+    """
+    compares a stored parameter with a queried one, floats with tolerance and tuples as the lists read from json
+    """
+    if isinstance(value, (int, float)) and isinstance(stored, (int, float)):
+        return bool(np.isclose(stored, value))
+    if isinstance(value, (tuple, list)) or isinstance(stored, (tuple, list)):
+        return json.dumps(stored) == json.dumps(value)
+    return stored == value
+
+
+def matches(parameters, fields):
+    """
+    returns True if the parameters of a sweep point contain every given field (floats compared with tolerance); the
+    optional fields of SimulationConfig missing from the parameters have their default value (see
+    SimulationConfig.parameters), and a point whose optional fields are not the defaults only matches a query giving them
+    """
+    from main4 import OPTIONAL_PARAMETERS  # main4 imports this module
+    for name, value in fields.items():
+        if name in parameters:
+            stored = parameters[name]
+        elif name in OPTIONAL_PARAMETERS:
+            stored = OPTIONAL_PARAMETERS[name]
+        else:
+            return False
+        if not equal(stored, value):
+            return False
+    for name, default in OPTIONAL_PARAMETERS.items():
+        if name not in fields and name in parameters and not equal(parameters[name], default):
+            return False
+    return True
+
+
+class ResultStore:
+    """
+    directory of sweep results: one sub-directory of .npy arrays per sweep point and an index.json describing them.
+    The arrays have one row per replica and one column per round and are memory-mapped when loaded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index = self.readIndex()
+
+    def readIndex(self):
+        path = os.path.join(self.directory, INDEX)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as file:
+            return json.load(file)
+
+    def writeIndex(self):
+        path = os.path.join(self.directory, INDEX)
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.index, file, indent=1, sort_keys=True)
+        os.replace(temporary, path)
+
+    def save(self, parameters, contributionR, contributionP, source=None, **extra):
+        """
+        saves (or replaces) the results of a sweep point
+        :param parameters: dictionary of the parameters of the sweep point, used as its identity
+        :param contributionR: contributions of the richs, size (replicas, rho)
+        :param contributionP: contributions of the poors, size (replicas, rho)
+        :param source: where the results come from (script, imported file)
+        :param extra: other arrays to store next to the contributions
+        :return: the key of the sweep point
+        """
+        key = pointKey(parameters)
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        arrays = dict(extra, contributionR=contributionR, contributionP=contributionP)
+        digest = hashlib.sha1()
+        for name in sorted(arrays):
+            array = np.atleast_2d(np.asarray(arrays[name], dtype=np.float64))
+            np.save(os.path.join(self.directory, key, name + '.npy'), array)
+            digest.update(name.encode())
+            digest.update(array.tobytes())
+        self.index[key] = {'parameters': parameters, 'arrays': sorted(arrays), 'digest': digest.hexdigest(),
+                           'source': source, 'time': time.time()}
+        self.writeIndex()
+        return key
+
+    def query(self, **fields):
+        """
+        returns the keys of the sweep points whose parameters contain the given fields, oldest first
+        """
+        entries = sorted(self.index.items(), key=lambda item: (item[1]['time'], item[0]))
+        return [key for key, entry in entries if matches(entry['parameters'], fields)]
+
+    def latest(self, **fields):
+        """
+        returns the key of the most recently saved sweep point matching the given fields, None if there is none
+        """
+        keys = self.query(**fields)
+        return keys[-1] if keys else None
+
+    def parameters(self, key):
+        return self.index[key]['parameters']
+
+    def digest(self, key):
+        return self.index[key]['digest']
+
+    def load(self, key, name='contributionR'):
+        """
+        returns a stored array of a sweep point without reading it into memory
+        """
+        return np.load(os.path.join(self.directory, key, name + '.npy'), mmap_mode='r')
+
+    def mean(self, key, name='contributionR'):
+        """
+        returns the average over the replicas of a stored array
+        """
+        return np.asarray(self.load(key, name)).mean(axis=0)
+
+    def pairedDifference(self, key, other, name='contributionR'):
+        """
+        returns the difference between two sweep points computed replica by replica, which is much more precise than
+        the difference of the means when both were run with common random numbers (sweep.py --common)
+        :return: the mean difference (key - other) and its standard error, at each round
+        """
+        first, second = np.asarray(self.load(key, name)), np.asarray(self.load(other, name))
+        if 'replicas' in self.index[key]['arrays'] and 'replicas' in self.index[other]['arrays']:
+            replicas = np.asarray(self.load(key, 'replicas')).ravel()
+            otherReplicas = list(np.asarray(self.load(other, 'replicas')).ravel())
+            shared = [i for i, replica in enumerate(replicas) if replica in otherReplicas]
+            first, second = first[shared], second[[otherReplicas.index(replicas[i]) for i in shared]]
+        differences = first - second
+        return differences.mean(axis=0), differences.std(axis=0, ddof=1) / np.sqrt(len(differences))
+
+
+def parseLegacyResults(text):
+    """
+    parses the printed output of main4.averageExperiences, in one of the two formats used in the txt files
+    :param text: content of the file
+    :return: list of (alphaR, alphaP, contributionR, contributionP)
+    """
+    number = r'([0-9.]+)'
+    vector = r'\[([^\]]*)\]'
+    printed = re.compile(r'ALPHA P = ' + number + r' \| ALPHA R = ' + number + r'.*?richs at each round\s*' + vector +
+                      r'\s*Contribution of poors at each round\s*' + vector, re.S)
+    compact = re.compile(r'alphaR = ' + number + r' alphaP = ' + number + r'\s*R = ' + vector + r'\s*P = ' + vector)
+    points = []
+    for match in printed.finditer(text):
+        alphaP, alphaR, richs, poors = match.groups()
+        points.append((float(alphaR), float(alphaP), np.array(richs.split(), dtype=float), np.array(poors.split(), dtype=float)))
+    for match in compact.finditer(text):
+        alphaR, alphaP, richs, poors = match.groups()
+        points.append((float(alphaR), float(alphaP), np.array(richs.split(), dtype=float), np.array(poors.split(), dtype=float)))
+    return points
+
+
+def importLegacyResults(store, path, parameters):
+    """
+    imports a txt file printed by main4 into the store
+    :param store: the ResultStore
+    :param path: path of the txt file
+    :param parameters: parameters shared by every point of the file (riskRoundType, population, ...)
+    :return: the keys of the imported points
+    """
+    with open(path) as file:
+        points = parseLegacyResults(file.read())
+    keys = []
+    for alphaR, alphaP, contributionR, contributionP in points:
+        keys.append(store.save(dict(parameters, alphaR=alphaR, alphaP=alphaP), contributionR, contributionP,
+                               source=os.path.basename(path)))
+    return keys
@@ -0,0 +1,601 @@
+import argparse
+import concurrent.futures
+import contextlib
+import dataclasses
+import multiprocessing
+import os
+import queue
+import numpy as np
+import engine
+import graphs
+import learning
+import main4
+import profiling
+import progress
+import recorder
+import sketches
+from shared import SharedResults
+from store import ResultStore, pointKey
+
+TIMINGS = ['EveryRound', 'FirstRound', 'LastRound', 'RandomRound']
+ALPHAS_R = [i / 10 for i in range(1, 11)]
+FIGURE3_ALPHAS_P = [1.0, 0.5]
+FIGURE4_ALPHAS = [(1.0, 1.0), (1.0, 0.8), (0.5, 0.8), (0.5, 0.5)]  # (alphaP, alphaR) of each column
+
+# Figure 2: homogeneous population of wealth Omega, same alpha for everyone, one line per risk curve
+OMEGAS = [1, 2, 4]
+ALPHAS = [i / 10 for i in range(0, 11)]
+RISK_CURVE_LAMBDAS = {1: 1, 2: 2, 3: 10}  # λ_1, λ_2 and λ_3 of getPCR1, getPCR2 and getPCR3
+
+heartbeats = None  # queue of the progress reporter, in the workers
+sharedResults = None  # SharedResults of the sweep, in the workers, if the results go through shared memory
+strategyRecording = None  # (directory, every, precision) of the recorded strategies, in the workers
+
+
+def initWorker(events, spec=None, recording=None):
+    global heartbeats, sharedResults, strategyRecording
+    heartbeats = events
+    sharedResults = None if spec is None else SharedResults.attach(spec)
+    strategyRecording = recording
+
+
+def replicaSeed(config, replica, seed=0):
+    """
+    returns the seed of a replica of a sweep point, derived from the parameters of the point so that it does not depend
+    on the order (or the machine) in which the points are run
+    """
+    entropy = int(pointKey(config.parameters()), 16)
+    return np.random.SeedSequence([seed, entropy, replica]).generate_state(1)[0]
+
+
+def runExperience(config, generations, seed, engineName, stats=None, progress=None, common=None, buffers=None):
+    """
+    runs one experience with the reference engine (main4) or the batched one (engine)
+    :param common: (seed of the sweep, replica) of the common random numbers, batched engine only
+    :param buffers: if given, arrays filled in place by the batched engine: 'trajectory' and 'payoffs' (see
+        engine.evolve) and 'population', the final strategies; and 'recorder', a recorder.StrategyRecorder, and
+        'histogram', a sketches.StrategyHistogram (the only one the reference engine takes)
+    :return: the contributions of each wealth class at each round, richs first; size (classes, rho)
+    """
+    if config.graph:
+        if engineName != 'batched' or buffers or config.dynamics != 'evolution':
+            raise ValueError("the structured populations only evolve on the batched engine, without recordings")
+        return graphs.evolveOnGraph(config, generations, np.random.default_rng(seed), stats, progress, common)
+    if config.dynamics != 'evolution':
+        if engineName != 'batched' or buffers:
+            raise ValueError("the learning dynamics only run on the batched engine, without recordings")
+        return learning.learn(config, generations, np.random.default_rng(seed), stats, progress, common)
+    if engineName == 'batched':
+        buffers = buffers or {}
+        contribution, strategies = engine.evolve(config, generations, np.random.default_rng(seed), stats, progress, common,
+                                                 trajectory=buffers.get('trajectory'), payoffs=buffers.get('payoffs'),
+                                                 recorder=buffers.get('recorder'), histogram=buffers.get('histogram'))
+        if 'population' in buffers:
+            buffers['population'][:] = strategies
+        return contribution
+    buffers = buffers or {}
+    if common is not None or set(buffers) - {'histogram'}:
+        raise ValueError("common random numbers and recordings need the batched engine")
+    if config.wealthClasses or config.wealthSpread or config.groupSize != 2 or config.pairing != 'random':
+        raise ValueError("the reference engine only plays pairs of richs and poors of constant wealth, use the batched engine")
+    main4.applyConfig(config)
+    np.random.seed(seed)
+    main4.stats, main4.progress = stats, progress
+    try:
+        return np.array(main4.experience(generations, buffers.get('histogram')))
+    finally:
+        main4.stats, main4.progress = None, None
+
+
+def runReplica(task):
+    """
+    runs one experience of a sweep point in a worker process, with the state given to initWorker
+    :param task: (point index, replica, config, generations, seed, profile, engine, common random numbers)
+    :return: (point index, replica, contributions of each wealth class; size (classes, rho))
+    """
+    return runReplicaWith(task, heartbeats, sharedResults, strategyRecording)
+
+
+def runReplicaWith(task, heartbeats=None, sharedResults=None, strategyRecording=None):
+    """
+    runs one experience of a sweep point, see runReplica; called directly by the threads of the thread backend, which
+    share the queue, the buffers and the recording settings of the parent instead of module globals
+    """
+    point, replica, config, generations, seed, profile, engineName, common = task
+    common = (seed, replica) if common else None
+    seed = replicaSeed(config, replica, seed)
+    heartbeat = None if heartbeats is None else progress.Heartbeat(heartbeats, point, replica)
+    buffers = {}
+    if sharedResults is not None:
+        sizes = engine.getClasses(config)[0]
+        classes, individuals = len(sizes), sizes.sum()
+        if hasattr(sharedResults, 'trajectory'):
+            buffers['trajectory'] = sharedResults.trajectory[point, replica, :, :classes, :config.rho]
+            buffers['payoffs'] = sharedResults.payoffs[point, replica, :, :classes]
+        if hasattr(sharedResults, 'populations'):
+            buffers['population'] = sharedResults.populations[point, replica, :individuals, :config.rho]
+        if hasattr(sharedResults, 'histograms'):
+            buffers['histogram'] = sketches.StrategyHistogram(classes, config.rho, sharedResults.histograms.shape[-1] - 2)
+    if strategyRecording is not None:
+        directory, every, precision = strategyRecording
+        path = recorder.recordingPath(directory, pointKey(config.parameters()), replica)
+        buffers['recorder'] = recorder.StrategyRecorder(path, engine.getClasses(config)[0].sum(), config.rho, every,
+                                                        precision=precision)
+    if profile is None:
+        contribution = runExperience(config, generations, seed, engineName, None, heartbeat, common, buffers)
+    else:
+        mode, directory = profile
+        path = os.path.join(directory, '%s-%d' % (pointKey(config.parameters()), replica))
+        stats = profiling.Stats()
+        run = lambda: runExperience(config, generations, seed, engineName, stats, heartbeat, common, buffers)
+        contribution = run() if mode == 'stages' else profiling.profileCall(run, mode, path)
+        stats.save(path + '.json')
+    if 'recorder' in buffers:
+        buffers['recorder'].close()
+    if 'histogram' in buffers:
+        histogram = buffers['histogram']
+        classes = len(histogram.counts)
+        sharedResults.histograms[point, replica, :classes, :config.rho] = histogram.counts
+        sharedResults.extremes[point, replica, :classes, :config.rho] = np.stack([histogram.lowest, histogram.highest], -1)
+    if heartbeat is not None:
+        heartbeat.done(generations, config.games)
+    if sharedResults is not None:
+        sharedResults.contributions[point, replica, :len(contribution), :config.rho] = contribution
+        return point, replica, None
+    return point, replica, contribution
+
+
+@contextlib.contextmanager
+def replicaPool(tasks, processes=None, backend='processes', events=None, results=None, recording=None):
+    """
+    runs the replicas of a sweep on a pool of worker processes, or of threads sharing the memory of the parent (batched
+    engine only: main4 keeps its parameters and its random state in module globals); the batched kernels spend most of
+    their time in numpy, which releases the GIL, and on a free-threaded Python the threads run fully in parallel
+    :param tasks: the tasks of runReplica
+    :param processes: the amount of workers (all the cores by default)
+    :param backend: 'processes' or 'threads'
+    :return: context manager giving the results of runReplica in the order the replicas end
+    """
+    if backend == 'threads':
+        pool = concurrent.futures.ThreadPoolExecutor(processes or os.cpu_count())
+        try:
+            futures = [pool.submit(runReplicaWith, task, events, results, recording) for task in tasks]
+            yield (future.result() for future in concurrent.futures.as_completed(futures))
+        finally:
+            pool.shutdown(cancel_futures=True)
+    elif backend == 'processes':
+        with multiprocessing.Pool(processes, initWorker, (events, results and results.spec(), recording)) as pool:
+            yield pool.imap_unordered(runReplica, tasks)
+    else:
+        raise ValueError("unknown backend %r" % backend)
+
+
+def shardTasks(configs, experiments, shard=(0, 1)):
+    """
+    returns the (point index, replica) pairs run by a shard; every pair is given to exactly one of the shards, only
+    depending on the parameters of the points, so that every node of a job array computes the same assignment
+    :param configs: list of SimulationConfig
+    :param experiments: the number of replicas of each point
+    :param shard: (index of the shard, amount of shards)
+    """
+    index, count = shard
+    if not 0 <= index < count:
+        raise ValueError("shard %d/%d does not exist" % (index, count))
+    keys = [pointKey(config.parameters()) for config in configs]
+    pairs = sorted((keys[point], replica, point) for point in range(len(configs)) for replica in range(experiments))
+    return [(point, replica) for i, (_, replica, point) in enumerate(pairs) if i % count == index]
+
+
+def runSweep(configs, experiments, generations, processes=None, store=None, seed=0, source='sweep.py', profile=None,
+             profileDirectory='profiles', status=None, shard=(0, 1), engineName='reference', common=False,
+             transport='pickle', record=False, keepPopulations=False, recordStrategies=None, recordEvery=1,
+             recordPrecision='float32', histogramBins=None, backend='processes'):
+    """
+    runs every replica of every sweep point on a pool of processes
+    :param configs: list of SimulationConfig
+    :param experiments: the number of replicas of each point
+    :param generations: the number of generations of each replica
+    :param processes: the number of worker processes (all the cores by default)
+    :param store: if given, the ResultStore where each point is saved as soon as its replicas are done
+    :param seed: seed of the sweep
+    :param profile: None, 'stages' (time of each stage and counters), 'cprofile' or 'sampling' (stages and a profile);
+        one report per replica is written in profileDirectory
+    :param status: if given, path of the json file where the progress of the sweep is written every few seconds
+    :param shard: (index, amount) of shards; only the replicas of this shard are run and saved, see mergeShards
+    :param engineName: 'reference' (main4, one game at a time) or 'batched' (engine, games batched by class pair)
+    :param common: if True, the replica i of every point uses the same random streams (batched engine only), so that
+        the differences between points can be computed replica by replica, see ResultStore.pairedDifference
+    :param transport: 'pickle' (the workers send their results back through the pool) or 'shared' (they write them in
+        SharedResults buffers indexed by (point, replica), read in place by the parent)
+    :param record: keep the contributions and payoffs of every generation (shared transport, batched engine), stored
+        as trajectory and payoffs
+    :param keepPopulations: keep the final strategies of every replica (shared transport, batched engine), stored as
+        population
+    :param recordStrategies: if given, directory where the strategies of every replica are recorded every recordEvery
+        generations (batched engine), with the precision recordPrecision, see recorder.StrategyRecorder; the recording
+        of a replica is named after the key of its point and read with recorder.StrategyTrajectory
+    :param histogramBins: if given, keep the histogram of the strategies played by every replica with this amount of
+        bins (shared transport), stored as histograms and extremes, see sketches.StrategyHistogram.fromReplicas
+    :param backend: 'processes' or 'threads' (batched engine), see replicaPool
+    :return: the contributions of the richest and of the poorest class, nan for the replicas of other shards; size
+        (points, experiments, rho); with more than two classes, the contributions of every class are also stored
+        as contributionClasses, one row of classes * rho values per replica
+    """
+    rho = max(config.rho for config in configs)
+    contributionR = np.full((len(configs), experiments, rho), np.nan)
+    contributionP = np.full((len(configs), experiments, rho), np.nan)
+    pairs = shardTasks(configs, experiments, shard)
+    replicas = [sorted(replica for point, replica in pairs if point == index) for index in range(len(configs))]
+    remaining = [len(indices) for indices in replicas]
+    classes = [{} for _ in configs]
+    sizes = [engine.getClasses(config)[0] for config in configs]
+    results = None
+    if transport == 'shared':
+        results = SharedResults.allocate(len(configs), experiments, max(map(len, sizes)), rho,
+                                         generations if record else None,
+                                         max(size.sum() for size in sizes) if keepPopulations else None, histogramBins)
+    elif record or keepPopulations or histogramBins:
+        raise ValueError("the recordings need the shared transport")
+    if profile is not None:
+        os.makedirs(profileDirectory, exist_ok=True)
+        profile = (profile, profileDirectory)
+    recording = None
+    if recordStrategies is not None:
+        os.makedirs(recordStrategies, exist_ok=True)
+        recording = (recordStrategies, recordEvery, recordPrecision)
+    tasks = [(point, replica, configs[point], generations, seed, profile, engineName, common) for point, replica in pairs]
+    if backend == 'threads' and engineName != 'batched':
+        raise ValueError("the thread backend needs the batched engine")
+    events = None
+    if status is not None:
+        events = queue.Queue() if backend == 'threads' else multiprocessing.Queue()
+    names = [pointKey(config.parameters()) for config in configs]
+    with results or contextlib.nullcontext(), replicaPool(tasks, processes, backend, events, results, recording) as done, \
+            progress.ProgressReporter(events, names, remaining[:], generations, status) if status else contextlib.nullcontext():
+        for point, replica, contribution in done:
+            if results is not None:
+                contribution = results.contributions[point, replica, :len(sizes[point]), :configs[point].rho]
+            contributionR[point, replica, :contribution.shape[1]] = contribution[0]
+            contributionP[point, replica, :contribution.shape[1]] = contribution[-1]
+            classes[point][replica] = contribution.ravel()
+            remaining[point] -= 1
+            if remaining[point] == 0 and store is not None:
+                config = configs[point]
+                parameters = dict(config.parameters(), experiments=experiments, generations=generations, engine=engineName)
+                if common:
+                    parameters.update(commonRandomNumbers=True, seed=seed)
+                rows = replicas[point]
+                extra = {'contributionClasses': [classes[point][row] for row in rows]} if len(contribution) > 2 else {}
+                if record:
+                    extra['trajectory'] = results.trajectory[point, rows, :, :len(sizes[point]), :config.rho]
+                    extra['payoffs'] = results.payoffs[point, rows, :, :len(sizes[point])]
+                if keepPopulations:
+                    extra['population'] = results.populations[point, rows, :sizes[point].sum(), :config.rho]
+                if histogramBins:
+                    extra['histograms'] = results.histograms[point, rows, :len(sizes[point]), :config.rho]
+                    extra['extremes'] = results.extremes[point, rows, :len(sizes[point]), :config.rho]
+                store.save(parameters, contributionR[point, rows, :config.rho], contributionP[point, rows, :config.rho],
+                           source=source, replicas=np.array(rows), **extra)
+    return contributionR, contributionP
+
+
+def mergeShards(store, shards, source='sweep.py'):
+    """
+    merges the stores written by the shards of a sweep into one store, giving the same arrays as a run on one node
+    :param store: the ResultStore where the merged points are saved
+    :param shards: the ResultStore of every shard
+    :return: the keys of the merged points
+    """
+    parts = {}
+    for shard in shards:
+        for key, entry in shard.index.items():
+            parts.setdefault(key, (entry['parameters'], []))[1].append(shard)
+    keys = []
+    for key, (parameters, owners) in sorted(parts.items()):
+        replicas = np.concatenate([np.asarray(owner.load(key, 'replicas')).ravel() for owner in owners]).astype(int)
+        order = np.argsort(replicas)
+        if not np.array_equal(replicas[order], np.arange(parameters['experiments'])):
+            raise ValueError("point %s: replicas %s instead of 0..%d, a shard is missing or duplicated"
+                             % (key, sorted(replicas.tolist()), parameters['experiments'] - 1))
+        arrays = {}
+        for name in owners[0].index[key]['arrays']:
+            if name != 'replicas':
+                arrays[name] = np.concatenate([np.asarray(owner.load(key, name)) for owner in owners])[order]
+        keys.append(store.save(parameters, source=source, replicas=replicas[order].astype(float), **arrays))
+    return keys
+
+
+def chains(configs, along='alphaR'):
+    """
+    groups the points that only differ by the parameter along, each group sorted by that parameter
+    :return: list of lists of point indices
+    """
+    groups = {}
+    for point, config in enumerate(configs):
+        parameters = config.parameters()
+        del parameters[along]
+        groups.setdefault(pointKey(parameters), []).append(point)
+    return [sorted(points, key=lambda point: getattr(configs[point], along)) for _, points in sorted(groups.items())]
+
+
+def runChain(task):
+    """
+    runs one replica along a chain of points in a worker (batched engine): the first point from a random population
+    during generations, exactly like runSweep, then each following point from the population evolved at the previous
+    one, during burnIn generations and warmGenerations averaged generations
+    :param task: (chain index, replica, configs of the chain, generations, burnIn, warmGenerations, seed)
+    :return: (chain index, replica, contributions of each class at each point; size (points, classes, rho))
+    """
+    chain, replica, configs, generations, burnIn, warmGenerations, seed = task
+    rng = np.random.default_rng(replicaSeed(configs[0], replica, seed))
+    contribution, strategies = engine.evolve(configs[0], generations, rng)
+    contributions = [contribution]
+    for config in configs[1:]:
+        contribution, strategies = engine.evolve(config, warmGenerations, rng, strategies=strategies, burnIn=burnIn)
+        contributions.append(contribution)
+    return chain, replica, np.array(contributions)
+
+
+def runContinuation(configs, experiments, generations, burnIn=100, warmGenerations=500, processes=None, store=None,
+                    seed=0, source='sweep.py', along='alphaR', descending=False):
+    """
+    runs a sweep by continuation along a parameter: the replica i of a point starts from the population of the replica
+    i of the previous point, so it only needs a short burn-in; one chain of points per value of the other parameters
+    :param generations: the generations of the first point of each chain, started from a random population
+    :param burnIn: the generations of the other points before their contributions are averaged
+    :param warmGenerations: the averaged generations of the other points
+    :param along: the parameter that changes along a chain
+    :param descending: run the chains from the largest value of the parameter, to look for hysteresis
+    :return: the contributions of the richest and of the poorest class; size (points, experiments, rho)
+    """
+    rho = max(config.rho for config in configs)
+    contributionR = np.full((len(configs), experiments, rho), np.nan)
+    contributionP = np.full((len(configs), experiments, rho), np.nan)
+    groups = [points[::-1] if descending else points for points in chains(configs, along)]
+    tasks = [(chain, replica, [configs[point] for point in points], generations, burnIn, warmGenerations, seed)
+             for chain, points in enumerate(groups) for replica in range(experiments)]
+    classes = [[None] * experiments for _ in configs]
+    remaining = [experiments] * len(groups)
+    with multiprocessing.Pool(processes) as pool:
+        for chain, replica, contributions in pool.imap_unordered(runChain, tasks):
+            for point, contribution in zip(groups[chain], contributions):
+                contributionR[point, replica, :contribution.shape[1]] = contribution[0]
+                contributionP[point, replica, :contribution.shape[1]] = contribution[-1]
+                classes[point][replica] = contribution.ravel()
+            remaining[chain] -= 1
+            if remaining[chain] == 0 and store is not None:
+                for position, point in enumerate(groups[chain]):
+                    config = configs[point]
+                    parameters = dict(config.parameters(), experiments=experiments, generations=generations, engine='batched')
+                    if position > 0:
+                        parameters.update(warmStart='descending' if descending else 'ascending', burnIn=burnIn,
+                                          warmGenerations=warmGenerations)
+                    extra = {'contributionClasses': classes[point]} if len(contributions[0]) > 2 else {}
+                    store.save(parameters, contributionR[point, :, :config.rho], contributionP[point, :, :config.rho],
+                               source=source, replicas=np.arange(experiments), **extra)
+    cold = len(configs) * experiments * generations
+    used = len(groups) * experiments * generations + (len(configs) - len(groups)) * experiments * (burnIn + warmGenerations)
+    print("Continuation: %d generations instead of %d for cold starts (%.0f%%)" % (used, cold, 100 * used / cold))
+    return contributionR, contributionP
+
+
+def runColdReplica(task):
+    """
+    runs one replica of a cold check in a worker (batched engine): from a random population, averaged over the same
+    last generations as the warm-started points
+    :param task: (point index, replica, config, burnIn, warmGenerations, seed)
+    :return: (point index, replica, contributions of each class; size (classes, rho))
+    """
+    point, replica, config, burnIn, warmGenerations, seed = task
+    rng = np.random.default_rng(replicaSeed(config, replica, seed))
+    return point, replica, engine.evolve(config, warmGenerations, rng, burnIn=burnIn)[0]
+
+
+def runColdCheck(configs, experiments, generations, warmGenerations=500, processes=None, store=None, seed=0,
+                 source='sweep.py'):
+    """
+    runs points of a continuation sweep from random populations during generations, averaging the contributions over
+    the last warmGenerations only, so that they are compared with the warm-started points over the same window instead
+    of including the transient of the random start (see hysteresis); the points are saved with their burnIn
+    :return: the contributions of the richest and of the poorest class; size (points, experiments, rho)
+    """
+    if warmGenerations > generations:
+        raise ValueError("the cold check averages the last %d of %d generations" % (warmGenerations, generations))
+    burnIn = generations - warmGenerations
+    rho = max(config.rho for config in configs)
+    contributionR = np.full((len(configs), experiments, rho), np.nan)
+    contributionP = np.full((len(configs), experiments, rho), np.nan)
+    tasks = [(point, replica, config, burnIn, warmGenerations, seed)
+             for point, config in enumerate(configs) for replica in range(experiments)]
+    remaining = [experiments] * len(configs)
+    with multiprocessing.Pool(processes) as pool:
+        for point, replica, contribution in pool.imap_unordered(runColdReplica, tasks):
+            contributionR[point, replica, :contribution.shape[1]] = contribution[0]
+            contributionP[point, replica, :contribution.shape[1]] = contribution[-1]
+            remaining[point] -= 1
+            if remaining[point] == 0 and store is not None:
+                config = configs[point]
+                parameters = dict(config.parameters(), experiments=experiments, generations=generations, engine='batched',
+                                  burnIn=burnIn, warmGenerations=warmGenerations)
+                store.save(parameters, contributionR[point, :, :config.rho], contributionP[point, :, :config.rho],
+                           source=source, replicas=np.arange(experiments))
+    return contributionR, contributionP
+
+
+def hysteresis(warm, cold, threshold=3.0):
+    """
+    compares the points of a continuation sweep with the same points started from random populations and averaged over
+    the same last generations (runColdCheck); a difference larger than threshold standard errors means that the evolved
+    population remembers the previous points (hysteresis) or that the burn-in is too short
+    :param warm: contributions of the continuation sweep; size (points, experiments, rho)
+    :param cold: contributions of the cold starts, nan for the points that were not checked; size (points, experiments', rho)
+    :return: for each checked point, (point index, difference of the total contribution, z-score, True if suspicious)
+    """
+    report = []
+    for point in range(len(warm)):
+        if np.isnan(cold[point]).all():
+            continue
+        warmTotal, coldTotal = np.nansum(warm[point], axis=1), np.nansum(cold[point], axis=1)
+        difference = warmTotal.mean() - coldTotal.mean()
+        error = np.sqrt(warmTotal.var(ddof=1) / len(warmTotal) + coldTotal.var(ddof=1) / len(coldTotal))
+        z = difference / error if error > 0 else 0.0
+        report.append((point, float(difference), float(z), bool(abs(z) > threshold)))
+    return report
+
+
+def refineTippingPoint(base, experiments, generations, coarse=ALPHAS_R, resolution=0.0125, budget=12, batch=None,
+                       processes=None, store=None, seed=0, source='sweep.py', engineName='reference', uncertainty=2.0):
+    """
+    locates the alphaR where the contribution of the richs jumps: runs the coarse grid, then repeatedly runs the middle
+    of the intervals with the steepest slope of contribution (change plus uncertainty standard errors, over the width of
+    the interval), until every interval is narrower than resolution or budget points were added
+    :param base: the SimulationConfig of the other parameters
+    :param coarse: the alphaR of the first grid
+    :param budget: the amount of points added to the coarse grid at most
+    :param batch: the amount of intervals split at each step, run in parallel (the amount of processes by default)
+    :return: the estimated tipping point (middle of the steepest interval), and the (alphaR, mean total contribution
+        of the richs, standard error) of every point run, sorted by alphaR
+    """
+    batch = batch or processes or os.cpu_count()
+    points = {}
+
+    def run(alphas):
+        configs = [dataclasses.replace(base, alphaR=alpha) for alpha in alphas]
+        contributionR, _ = runSweep(configs, experiments, generations, processes, store, seed, source,
+                                    engineName=engineName)
+        for alpha, replicas in zip(alphas, contributionR):
+            totals = replicas[:, :base.rho].sum(axis=1)
+            points[alpha] = (totals.mean(), totals.std(ddof=1) / np.sqrt(len(totals)) if len(totals) > 1 else 0.0)
+
+    run(list(coarse))
+    added = 0
+    while added < budget:
+        alphas = sorted(points)
+        intervals = [((abs(points[right][0] - points[left][0]) + uncertainty * np.hypot(points[left][1], points[right][1]))
+                      / (right - left), left, right) for left, right in zip(alphas, alphas[1:]) if right - left > resolution]
+        if not intervals:
+            break
+        chosen = sorted(intervals, reverse=True)[:min(batch, budget - added)]
+        run([round((left + right) / 2, 10) for _, left, right in chosen])
+        added += len(chosen)
+
+    alphas = sorted(points)
+    steepest = max(zip(alphas, alphas[1:]),
+                   key=lambda interval: abs(points[interval[1]][0] - points[interval[0]][0]) / (interval[1] - interval[0]))
+    return sum(steepest) / 2, [(alpha,) + points[alpha] for alpha in alphas]
+
+
+def figure2Grid(base=main4.SimulationConfig()):
+    """
+    returns the SimulationConfig of every point of the Omega x alpha x risk curve grid of Figure 2
+    """
+    return [dataclasses.replace(base, wealthR=omega, wealthP=omega, alphaR=alpha, alphaP=alpha, riskCurve=curve,
+                                lambdaA=RISK_CURVE_LAMBDAS[curve], riskRoundType=main4.RiskRoundType.EveryRound)
+            for omega in OMEGAS for curve in sorted(RISK_CURVE_LAMBDAS) for alpha in ALPHAS]
+
+
+def figure3Grid(base=main4.SimulationConfig()):
+    """
+    returns the SimulationConfig of every point of Figure 3: every timing x alphaP x alphaR
+    """
+    return [dataclasses.replace(base, riskRoundType=main4.RiskRoundType[timing], alphaP=alphaP, alphaR=alphaR)
+            for timing in TIMINGS for alphaP in FIGURE3_ALPHAS_P for alphaR in ALPHAS_R]
+
+
+def figure4Grid(base=main4.SimulationConfig()):
+    """
+    returns the SimulationConfig of every point of Figure 4: every timing x (alphaP, alphaR) column
+    """
+    return [dataclasses.replace(base, riskRoundType=main4.RiskRoundType[timing], alphaP=alphaP, alphaR=alphaR)
+            for timing in TIMINGS for alphaP, alphaR in FIGURE4_ALPHAS]
+
+
+GRIDS = {'fig2': figure2Grid, 'fig3': figure3Grid, 'fig4': figure4Grid}
+
+
+def parseShard(text):
+    index, count = text.split('/')
+    return int(index), int(count)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs a sweep grid, possibly as one shard of a job array')
+    parser.add_argument('grid', choices=sorted(GRIDS) + ['tipping'],
+                        help='the grid to run, or tipping: adaptive search of the tipping point in alphaR')
+    parser.add_argument('--experiments', type=int, default=3, help='replicas of each point')
+    parser.add_argument('--generations', type=int, default=2000, help='generations of each replica')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (all the cores by default)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the sweep, the same on every shard')
+    parser.add_argument('--results', default='results', help='directory of the result store')
+    parser.add_argument('--shard', type=parseShard, default=None,
+                        help='i/n: only run the shard i (from 0) of n, in results/shard-i-of-n; e.g. $SLURM_ARRAY_TASK_ID/n')
+    parser.add_argument('--timing', choices=TIMINGS, default='EveryRound', help='timing of the tipping point search')
+    parser.add_argument('--alpha-p', type=float, default=1.0, help='alphaP of the tipping point search')
+    parser.add_argument('--budget', type=int, default=12, help='points added to the coarse grid by the tipping point search')
+    parser.add_argument('--resolution', type=float, default=0.0125, help='narrowest alphaR interval split by the search')
+    parser.add_argument('--merge', type=int, default=None, metavar='N', help='merge the N shards into the result store')
+    parser.add_argument('--status', default=None, help='json file where the progress is written')
+    parser.add_argument('--profile', choices=['stages', 'cprofile', 'sampling'], default=None, help='profile every replica')
+    parser.add_argument('--engine', choices=['reference', 'batched'], default='reference', help='simulation engine')
+    parser.add_argument('--common', action='store_true', help='common random numbers across the points (batched engine)')
+    parser.add_argument('--shared', action='store_true', help='results written by the workers in shared memory')
+    parser.add_argument('--record', action='store_true',
+                        help='store the contributions and payoffs of every generation (batched engine, implies --shared)')
+    parser.add_argument('--keep-populations', action='store_true',
+                        help='store the final strategies of every replica (batched engine, implies --shared)')
+    parser.add_argument('--record-strategies', default=None, metavar='DIRECTORY',
+                        help='record the strategies of every replica in compressed files of this directory (batched engine)')
+    parser.add_argument('--record-every', type=int, default=1, help='generations between two recorded populations')
+    parser.add_argument('--record-precision', choices=recorder.PRECISIONS, default='float32',
+                        help='precision of the recorded strategies, uint8 and uint16 being quantized')
+    parser.add_argument('--threads', action='store_true',
+                        help='run the replicas on threads of this process instead of worker processes (batched engine)')
+    parser.add_argument('--histograms', type=int, default=None, metavar='BINS',
+                        help='store the histogram of tau, a and b at each round of every replica (implies --shared)')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='continuation along alphaR: each point starts from the population of the previous one (batched engine)')
+    parser.add_argument('--burn-in', type=int, default=100, help='generations before averaging, for the warm-started points')
+    parser.add_argument('--warm-generations', type=int, default=500, help='averaged generations of the warm-started points')
+    parser.add_argument('--descending', action='store_true', help='run the continuation from the largest alphaR')
+    parser.add_argument('--cold-check', type=int, default=0, metavar='K',
+                        help='also run every K-th warm-started point from a random population and report the hysteresis')
+    arguments = parser.parse_args()
+
+    if arguments.merge is not None:
+        shards = [ResultStore(os.path.join(arguments.results, 'shard-%d-of-%d' % (i, arguments.merge))) for i in range(arguments.merge)]
+        print("Merged", len(mergeShards(ResultStore(arguments.results), shards)), "sweep points")
+    elif arguments.grid == 'tipping':
+        base = main4.SimulationConfig(riskRoundType=main4.RiskRoundType[arguments.timing], alphaP=arguments.alpha_p)
+        tipping, points = refineTippingPoint(base, arguments.experiments, arguments.generations,
+                                             resolution=arguments.resolution, budget=arguments.budget,
+                                             processes=arguments.processes, store=ResultStore(arguments.results),
+                                             seed=arguments.seed, engineName=arguments.engine)
+        for alpha, mean, error in points:
+            print("alphaR = %.4f  richs: %.3f +- %.3f" % (alpha, mean, error))
+        print("Tipping point: alphaR = %.4f" % tipping)
+    elif arguments.warm_start:
+        configs = GRIDS[arguments.grid]()
+        store = ResultStore(arguments.results)
+        warm, _ = runContinuation(configs, arguments.experiments, arguments.generations, arguments.burn_in,
+                                  arguments.warm_generations, arguments.processes, store, arguments.seed,
+                                  descending=arguments.descending)
+        if arguments.cold_check:
+            checked = [point for points in chains(configs) for point in points[1::arguments.cold_check]]
+            cold, _ = runColdCheck([configs[point] for point in checked], arguments.experiments, arguments.generations,
+                                   arguments.warm_generations, arguments.processes, store, arguments.seed)
+            coldAll = np.full(warm.shape[:1] + cold.shape[1:], np.nan)
+            coldAll[checked] = cold
+            for point, difference, z, suspicious in hysteresis(warm, coldAll):
+                print("%s: warm - cold = %+.3f (z = %+.1f)%s" % (pointKey(configs[point].parameters()), difference, z,
+                                                                  '  HYSTERESIS?' if suspicious else ''))
+    else:
+        shard = arguments.shard or (0, 1)
+        directory = arguments.results if arguments.shard is None else os.path.join(arguments.results, 'shard-%d-of-%d' % shard)
+        runSweep(GRIDS[arguments.grid](), arguments.experiments, arguments.generations, arguments.processes, ResultStore(directory),
+                 arguments.seed, profile=arguments.profile, status=arguments.status, shard=shard, engineName=arguments.engine,
+                 common=arguments.common, record=arguments.record, keepPopulations=arguments.keep_populations,
+                 recordStrategies=arguments.record_strategies, recordEvery=arguments.record_every,
+                 recordPrecision=arguments.record_precision, histogramBins=arguments.histograms,
+                 backend='threads' if arguments.threads else 'processes',
+                 transport='shared' if arguments.shared or arguments.record or arguments.keep_populations
+                 or arguments.histograms else 'pickle')
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import engine
+import main4
+from main4 import RiskRoundType
+
+
+@pytest.mark.parametrize('riskRoundType', list(RiskRoundType))
+def testRiskSchedulesAreTheLawOfTheMasks(riskRoundType):
+    config = main4.SimulationConfig(riskRoundType=riskRoundType, riskRoundProbability=0.3)
+    masks, probabilities = engine.getRiskSchedules(config)
+    assert np.isclose(probabilities.sum(), 1)
+    drawn = engine.getRiskRounds(config, 100000, np.random.default_rng(0))
+    codes = drawn @ (1 << np.arange(config.rho))
+    frequencies = [np.mean(codes == code) for code in masks @ (1 << np.arange(config.rho))]
+    assert np.allclose(frequencies, probabilities, atol=0.005)
+
+
+@pytest.mark.parametrize('riskRoundType', [RiskRoundType.RandomRound, RiskRoundType.BernoulliRounds,
+                                           RiskRoundType.GeometricHorizon])
+def testRoundRobinAveragesTheSchedules(riskRoundType):
+    config = main4.SimulationConfig(riskRoundType=riskRoundType, wealthClasses=((3, 4, 1.0), (3, 1, 0.5)),
+                                    pairing='roundRobin')
+    sizes, wealth, alphas = engine.getClasses(config)
+    classOf = np.repeat(np.arange(len(sizes)), sizes)
+    rng = np.random.default_rng(1)
+    strategies = engine.initStrategies(wealth[classOf], config.rho, rng)
+    fitness, _ = engine.simulateRoundRobin(config, strategies, classOf, wealth[classOf], alphas)
+
+    payoffs = [engine.playAllPairs(strategies, wealth[classOf], alphas[classOf], mask.astype(np.float64),
+                                   engine.RISK_CURVES[config.riskCurve], config.lambdaA)[0]
+               for mask in engine.getRiskRounds(config, 4000, rng)]
+    others = ~np.eye(len(classOf), dtype=bool)
+    sampled = (np.mean(payoffs, axis=0) * others).sum(axis=1) / (len(classOf) - 1)
+    assert np.allclose(np.log(fitness), sampled, rtol=0.05, atol=0.05)
+
+
+def testDrawGroupsAreDistinctAndUniform():
+    rng = np.random.default_rng(0)
+    groups = engine.drawGroups(6, 60000, 3, rng)
+    assert groups.shape == (60000, 3) and groups.min() >= 0 and groups.max() < 6
+    assert np.all(np.diff(np.sort(groups, axis=1), axis=1) > 0)
+    # the 20 sets of 3 among 6 are equally likely, and every individual is as likely to be drawn first
+    sets = np.unique(np.sort(groups, axis=1), axis=0, return_counts=True)[1]
+    assert len(sets) == 20 and np.all(np.abs(sets / 3000 - 1) < 0.1)
+    assert np.all(np.abs(np.bincount(groups[:, 0], minlength=6) / 10000 - 1) < 0.05)
+
+
+def testDrawGroupsOfWholePopulation():
+    groups = engine.drawGroups(5, 100, 5, np.random.default_rng(0))
+    assert np.all(np.sort(groups, axis=1) == np.arange(5))
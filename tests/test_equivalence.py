@@ -0,0 +1,32 @@
+import numpy as np
+import equivalence
+
+
+def testKsTest():
+    rng = np.random.default_rng(0)
+    assert equivalence.ksTest(rng.random(500), rng.random(500))[1] > 0.01
+    assert equivalence.ksTest(rng.random(500), rng.random(500) + 0.3)[1] < 1e-6
+
+
+def testReportOnSmallSamples():
+    # 12 skewed replicas per engine: the intervals keep (close to) their level, a real shift still fails
+    rng = np.random.default_rng(1)
+    alarms = 0
+    for _ in range(200):
+        report = equivalence.Report('same')
+        for label in range(8):
+            first, second = rng.gamma(2, 1, 12), rng.gamma(2, 1, 12)
+            report.add(label, *equivalence.ksTest(first, second), equivalence.bootstrapDifferences(first, second, rng))
+        alarms += bool(report.failures())
+    assert alarms <= 10  # 1% expected, about 7% with percentile intervals
+
+    report = equivalence.Report('shifted')
+    first, second = rng.gamma(2, 1, 12) + 3, rng.gamma(2, 1, 12)
+    report.add('shift', *equivalence.ksTest(first, second), equivalence.bootstrapDifferences(first, second, rng))
+    assert report.failures() == ['shift']
+
+
+def testConstantSamples():
+    report = equivalence.Report('constant')
+    report.add('zeros', 0.0, 1.0, equivalence.bootstrapDifferences(np.zeros(10), np.zeros(10), np.random.default_rng(0)))
+    assert report.failures() == []
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import graphs
+import main4
+
+
+def checkCsr(graph):
+    assert graph.indptr[-1] == 2 * len(graph.edgesA) == len(graph.indices)
+    assert np.all(graph.edgesA < graph.edgesB)  # no loops, each edge once
+    for node in range(graph.nodes):
+        for neighbour in graph.indices[graph.indptr[node]:graph.indptr[node + 1]]:
+            assert node in graph.indices[graph.indptr[neighbour]:graph.indptr[neighbour + 1]]
+
+
+def testLattice():
+    graph = graphs.lattice(16)
+    checkCsr(graph)
+    assert np.all(graph.degrees() == 4)
+    with pytest.raises(ValueError):
+        graphs.lattice(15)
+
+
+def testSmallWorld():
+    graph = graphs.smallWorld(50, 4, 0.2, np.random.default_rng(0))
+    checkCsr(graph)
+    assert np.all(graphs.smallWorld(50, 4, 0.0, np.random.default_rng(0)).degrees() == 4)
+
+
+def testScaleFree():
+    graph = graphs.scaleFree(60, 4, np.random.default_rng(0))
+    checkCsr(graph)
+    assert np.all(graph.degrees() >= 1)
+    with pytest.raises(ValueError):
+        graphs.scaleFree(3, 4, np.random.default_rng(0))
+
+
+def testScaleFreeDegrees():
+    # Barabasi-Albert with 2 links per node: P(k) = 12 / (k (k + 1) (k + 2)) for k >= 2
+    degrees = graphs.scaleFree(20000, 4, np.random.default_rng(1)).degrees()
+    assert abs(degrees.mean() - 4) < 0.01
+    for k in (2, 3, 4):
+        assert abs(np.mean(degrees == k) - 12 / (k * (k + 1) * (k + 2))) < 0.01
+
+
+@pytest.mark.parametrize('changes', [{'groupSize': 3}, {'pairing': 'roundRobin'}])
+def testEvolveOnGraphRejectsGroups(changes):
+    config = main4.SimulationConfig(graph='smallWorld', **changes)
+    with pytest.raises(ValueError):
+        graphs.evolveOnGraph(config, 1, np.random.default_rng(0))
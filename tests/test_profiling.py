@@ -0,0 +1,25 @@
+import json
+import numpy as np
+import engine
+import main4
+from profiling import Stats
+
+
+def testCountersStayJsonIntegers(tmp_path):
+    stats = Stats()
+    stats.count('games', np.int64(3))
+    stats.count('lossEvents', np.count_nonzero([True, False, True]))
+    config = main4.SimulationConfig(games=50)
+    engine.experience(config, 5, np.random.default_rng(0), stats)
+    assert all(type(amount) is int for amount in stats.counters.values())
+    stats.save(str(tmp_path / 'stats.json'))
+    with open(tmp_path / 'stats.json') as file:
+        counters = json.load(file)['counters']
+    assert counters['generations'] == 5 and counters['games'] == 3 + 5 * 50 and counters['lossEvents'] >= 2
+
+
+def testMutateCountsPythonIntegers():
+    rng = np.random.default_rng(0)
+    wealthOf = np.full(10, 4.0)
+    strategies = engine.initStrategies(wealthOf, 4, rng)
+    assert type(engine.mutate(strategies, wealthOf, 0.5, 0.15, rng)) is int
@@ -0,0 +1,58 @@
+import asyncio
+import concurrent.futures
+import numpy as np
+import main4
+import service
+import sweep
+from store import ResultStore
+
+
+def getService(store=None):
+    jobService = service.JobService(1, store)
+    jobService.pool.shutdown()
+    jobService.pool = concurrent.futures.ThreadPoolExecutor(1)
+    return jobService
+
+
+def savePoint(store, config, value):
+    parameters = dict(config.parameters(), experiments=3, generations=2000, engine='batched')
+    return store.save(parameters, np.full((3, config.rho), value), np.zeros((3, config.rho)))
+
+
+def testCachedSubmissionIsTheExactPoint(tmp_path):
+    store = ResultStore(str(tmp_path))
+    # saved first: a query on the default fields would have matched it if it ignored the optional ones
+    savePoint(store, main4.SimulationConfig(pairing='roundRobin'), 2.0)
+    savePoint(store, main4.SimulationConfig(), 1.0)
+    jobService = getService(store)
+    job = jobService.submit({'config': {}})
+    assert job.done and job.messages[-1]['cached']
+    assert job.messages[-1]['contributionR'] == [1.0] * main4.SimulationConfig().rho
+    assert jobService.submit({'config': {}}) is job
+    assert jobService.submit({'config': {}, 'seed': 1}) is not job
+
+
+def testFailedJobIsForgotten(monkeypatch):
+    def failing(task):
+        raise RuntimeError("replica %d failed" % task[1])
+
+    async def run():
+        jobService = getService()
+        jobService.loop = asyncio.get_running_loop()
+        monkeypatch.setattr(sweep, 'runReplica', failing)
+        job = jobService.submit({'config': {}, 'experiments': 4, 'generations': 5})
+        await asyncio.gather(*job.futures, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert job.done and job.failed and job.key not in jobService.jobs
+        assert [message['event'] for message in job.messages] == ['queued', 'error']
+        assert all(contribution is None for contribution in job.contributions)
+
+        monkeypatch.setattr(sweep, 'runReplica', lambda task: (task[0], task[1], np.ones((2, 4))))
+        retried = jobService.submit({'config': {}, 'experiments': 4, 'generations': 5})
+        assert retried is not job
+        await asyncio.gather(*retried.futures)
+        await asyncio.sleep(0)
+        assert retried.done and not retried.failed and retried.messages[-1]['event'] == 'done'
+        jobService.pool.shutdown()
+
+    asyncio.run(run())
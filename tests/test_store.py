@@ -0,0 +1,41 @@
+import numpy as np
+import main4
+from store import ResultStore, equal, matches, pointKey
+
+
+def testPointKeyIgnoresTheOrder():
+    assert pointKey({'alphaR': 0.5, 'rho': 4}) == pointKey({'rho': 4, 'alphaR': 0.5})
+    assert pointKey({'alphaR': 0.5}) != pointKey({'alphaR': 0.6})
+
+
+def testEqual():
+    assert equal(0.30000000000000004, 0.3)
+    assert equal([[20, 4, 1.0]], ((20, 4, 1.0),))
+    assert not equal('EveryRound', 'FirstRound')
+
+
+def testMatchesTheDefaultsOfTheOptionalFields():
+    default = main4.SimulationConfig(alphaR=0.5).parameters()
+    grouped = main4.SimulationConfig(alphaR=0.5, groupSize=6).parameters()
+    assert 'groupSize' not in default
+    assert matches(default, {'alphaR': 0.5})
+    assert matches(default, {'alphaR': 0.5, 'groupSize': 2})
+    assert not matches(default, {'alphaR': 0.5, 'groupSize': 6})
+    assert not matches(grouped, {'alphaR': 0.5})
+    assert matches(grouped, {'alphaR': 0.5, 'groupSize': 6})
+    assert not matches(default, {'unknown': 1})
+
+
+def testRoundTrip(tmp_path):
+    store = ResultStore(str(tmp_path))
+    parameters = dict(main4.SimulationConfig(alphaR=0.5).parameters(), experiments=2, generations=10)
+    contributionR, contributionP = np.arange(8.0).reshape(2, 4), np.ones((2, 4))
+    key = store.save(parameters, contributionR, contributionP, source='test', replicas=np.arange(2.0))
+    assert key == pointKey(parameters)
+    assert store.latest(alphaR=0.5) == key and store.latest(alphaR=0.6) is None
+
+    reopened = ResultStore(str(tmp_path))
+    assert reopened.parameters(key) == parameters and reopened.digest(key) == store.digest(key)
+    assert np.array_equal(reopened.load(key), contributionR)
+    assert np.array_equal(reopened.mean(key, 'contributionP'), np.ones(4))
+    assert np.array_equal(reopened.load(key, 'replicas'), [[0.0, 1.0]])
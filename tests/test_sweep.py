@@ -0,0 +1,49 @@
+import numpy as np
+import main4
+import sweep
+from store import ResultStore
+
+
+def stepSweep(step, height, trend):
+    """
+    returns a stand-in of sweep.runSweep whose total contribution of the richs is trend * alphaR plus height above step
+    """
+    def runSweep(configs, experiments, generations, *arguments, **options):
+        rho = configs[0].rho
+        totals = np.array([trend * config.alphaR + height * (config.alphaR > step) for config in configs])
+        contributionR = np.repeat(totals[:, None, None] / rho, experiments, axis=1).repeat(rho, axis=2)
+        return contributionR, np.zeros_like(contributionR)
+    return runSweep
+
+
+def testRefineTippingPointConvergesToStep(monkeypatch):
+    # the step (0.25) is smaller than the change of the trend over a coarse interval (0.3), only its slope is larger
+    monkeypatch.setattr(sweep, 'runSweep', stepSweep(0.437, 0.25, 3.0))
+    tipping, points = sweep.refineTippingPoint(main4.SimulationConfig(), 2, 10, resolution=0.0125, budget=6, batch=1)
+    assert abs(tipping - 0.437) <= 0.0125
+    assert len(points) <= len(sweep.ALPHAS_R) + 6
+    assert [alpha for alpha, _, _ in points] == sorted(alpha for alpha, _, _ in points)
+
+
+def testShardsCoverEveryReplicaOnce():
+    configs = [main4.SimulationConfig(alphaR=alpha) for alpha in (0.2, 0.5, 0.8)]
+    shards = [sweep.shardTasks(configs, 5, (index, 4)) for index in range(4)]
+    pairs = sorted(pair for shard in shards for pair in shard)
+    assert pairs == [(point, replica) for point in range(3) for replica in range(5)]
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+
+def testMergedShardsEqualOneRun(tmp_path):
+    configs = [main4.SimulationConfig(alphaR=alpha, games=20) for alpha in (0.3, 0.9)]
+    options = {'processes': 1, 'engineName': 'batched', 'backend': 'threads'}
+    whole = ResultStore(str(tmp_path / 'whole'))
+    sweep.runSweep(configs, 3, 5, store=whole, **options)
+    shards = [ResultStore(str(tmp_path / ('shard-%d' % index))) for index in range(2)]
+    for index, shard in enumerate(shards):
+        sweep.runSweep(configs, 3, 5, store=shard, shard=(index, 2), **options)
+    merged = ResultStore(str(tmp_path / 'merged'))
+    keys = sweep.mergeShards(merged, shards)
+    assert sorted(keys) == sorted(whole.index)
+    for key in keys:
+        for name in ('contributionR', 'contributionP'):
+            assert np.array_equal(merged.load(key, name), whole.load(key, name))